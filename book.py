@@ -3,7 +3,7 @@ import random
 
 from defs import Board
 from make_mov import MakeMove, TakeMove
-from move_gen import GenerateAllMoves, MoveList
+from move_gen import GenerateLegalMoves, ScratchMoveList
 from move_io import NOMOVE, ParseMove
 
 
@@ -37,14 +37,15 @@ def load_opening_book(path=DEFAULT_BOOK_PATH):
     with open(path, "r", encoding="utf-8") as f:
         lines = f.readlines()
 
+    start = Board.from_fen(START_FEN)
+
     for raw in lines:
         line = raw.strip()
         if not line or line.startswith("#") or line.startswith(";"):
             continue
 
         tokens = line.split()
-        pos = Board()
-        pos.parse_fen(START_FEN)
+        pos = start.copy()
 
         for token in tokens:
             pos_key = pos.pos_key
@@ -59,16 +60,9 @@ def load_opening_book(path=DEFAULT_BOOK_PATH):
 
 
 def _legal_moves_set(board):
-    legal = set()
-    move_list = MoveList()
-    GenerateAllMoves(board, move_list)
-
-    for i in range(move_list.count):
-        move = move_list.moves[i].move
-        if MakeMove(board, move):
-            legal.add(move)
-            TakeMove(board)
-    return legal
+    move_list = ScratchMoveList
+    GenerateLegalMoves(board, move_list)
+    return set(move_list.moves[:move_list.count])
 
 
 def get_book_move(board):
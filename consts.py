@@ -0,0 +1,57 @@
+# consts.py
+# Plain-int copies of the defs enums (Pieces, Side, Square, Ranks, Castling)
+# for the engine core's hot paths.
+# Every Pieces.wP is a module lookup plus an enum class attribute lookup, and
+# enum members stored in board state make every later compare and list index
+# go through the int subclass. The engine core (defs.Board, move_gen, make_mov,
+# search, evaluate, hashkeys) uses these instead; the public enums stay as they
+# are and still compare equal to these values.
+
+EMPTY = 0
+wP = 1
+wN = 2
+wB = 3
+wR = 4
+wQ = 5
+wK = 6
+bP = 7
+bN = 8
+bB = 9
+bR = 10
+bQ = 11
+bK = 12
+
+WHITE = 0
+BLACK = 1
+BOTH = 2
+
+RANK_1 = 0
+RANK_2 = 1
+RANK_3 = 2
+RANK_4 = 3
+RANK_5 = 4
+RANK_6 = 5
+RANK_7 = 6
+RANK_8 = 7
+
+# Squares named by make/unmake and castling generation
+A1 = 21; B1 = 22; C1 = 23; D1 = 24; E1 = 25; F1 = 26; G1 = 27; H1 = 28
+A8 = 91; B8 = 92; C8 = 93; D8 = 94; E8 = 95; F8 = 96; G8 = 97; H8 = 98
+NO_SQ = 99
+
+WKSC = 1
+WQSC = 2
+BKSC = 4
+BQSC = 8
+
+# Per-piece tables, indexed by piece:
+#                   EMPTY  wP     wN     wB     wR     wQ     wK     bP     bN     bB     bR     bQ     bK
+IsPawn   = (False, True,  False, False, False, False, False, True,  False, False, False, False, False)
+IsKnight = (False, False, True,  False, False, False, False, False, True,  False, False, False, False)
+IsBishop = (False, False, False, True,  False, False, False, False, False, True,  False, False, False)
+IsRook   = (False, False, False, False, True,  False, False, False, False, False, True,  False, False)
+IsQueen  = (False, False, False, False, False, True,  False, False, False, False, False, True,  False)
+IsKing   = (False, False, False, False, False, False, True,  False, False, False, False, False, True)
+
+# Colour-blind piece type, 0 for EMPTY (1 = pawn ... 6 = king)
+PieceType = (0, 1, 2, 3, 4, 5, 6, 1, 2, 3, 4, 5, 6)
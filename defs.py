@@ -1,15 +1,20 @@
 # defs.py
 from enum import IntEnum
+import os
 import sys
 from validate import *
+from consts import *
 
 
 def AllInit():
     init_sq120tosq64()
+    init_bitboard_attacks()
     from hashkeys import init_hash_keys
     init_hash_keys()
     from move_gen import InitMvvLva
     InitMvvLva()
+    from evaluate import InitEvalTables
+    InitEvalTables()
 
 
 U64 = int
@@ -21,8 +26,14 @@ MAX_GAME_MOVES = 2048
 # maximum number of moves (mostly engines use numbers between 1024 to 4096)
 # these are half moves
 # used to keep a track of the game, and use undos 
+HISTORY_CHUNK = 128
+# the history stack starts this big and doubles on demand (up to MAX_GAME_MOVES)
+# so a fresh Board does not pay for 2048 Undo objects it will never touch
 MAXDEPTH = 64
 
+MOVE_OVERHEAD_MS = 50
+# default time kept back from every UCI time allocation for GUI/IO lag
+# (the "Move Overhead" option)
 
 ENGINE_NAME = "Hydra 1.0"
 # Name of the engine - can be anything but i am obsessed with Hydra so...
@@ -31,6 +42,31 @@ ENGINE_NAME = "Hydra 1.0"
 # Keep False for normal play/search speed.
 DEBUG_CHECK_BOARD = False
 
+# Board consistency checks on the make/unmake + perft hot path
+# 0 -> release mode: check_board() is never called per node
+# 1 -> full debug: check every make/unmake (same as DEBUG_CHECK_BOARD)
+# N -> sampled: check every Nth make/unmake, cheap enough to leave on in CI
+# HYDRA_CHECK_BOARD=N in the environment sets it at startup; SetBoardChecks() at runtime
+CHECK_BOARD_EVERY = 1 if DEBUG_CHECK_BOARD else int(os.environ.get("HYDRA_CHECK_BOARD", "0") or 0)
+_check_board_tick = 0
+
+
+def SetBoardChecks(every):
+    global CHECK_BOARD_EVERY, DEBUG_CHECK_BOARD, _check_board_tick
+    CHECK_BOARD_EVERY = max(0, int(every))
+    DEBUG_CHECK_BOARD = CHECK_BOARD_EVERY == 1
+    _check_board_tick = 0
+
+
+def SampledCheckBoard(pos):
+    # Callers guard with `if defs.CHECK_BOARD_EVERY:` so release mode pays one attribute lookup
+    global _check_board_tick
+    _check_board_tick += 1
+    if _check_board_tick >= CHECK_BOARD_EVERY:
+        _check_board_tick = 0
+        if not pos.check_board():
+            raise AssertionError("check_board failed - engine state is corrupted")
+
 
 BOARD_SQ_NUM = 120
 # Size of the board, including the actual chess board along with the excess squares to check for invalid positions 
@@ -106,7 +142,7 @@ class Square(IntEnum):
     NO_SQ = 99
 # defining the entire board of operation
 # NO_SQ is used for calculations of stuff like out of board, en-passant etc
-NO_SQ = Square.NO_SQ
+# (the plain-int NO_SQ used by the engine comes from consts)
 
 class Castling(IntEnum):
     WKSC = 1
@@ -157,6 +193,13 @@ class SearchInfo:
         "fhf",
         "stdin_enabled",
         "stdin_buffer",
+        "threads",
+        "stop_event",
+        "ponder",
+        "ponder_time",
+        "multi_pv",
+        "move_overhead",
+        "excluded",
     )
 
     def __init__(self):
@@ -174,6 +217,21 @@ class SearchInfo:
         self.fhf = 0.0
         self.stdin_enabled = 1
         self.stdin_buffer = ""
+        self.threads = 1
+        # Lazy SMP: number of search processes, and the shared stop flag
+        # (a multiprocessing.Event) every helper polls in CheckUp; the UCI
+        # loop uses a threading.Event here to stop its search thread
+        self.stop_event = None
+        # go ponder: search without a clock until ponderhit, which then
+        # allows ponder_time ms (0 = no limit) from that moment
+        self.ponder = 0
+        self.ponder_time = 0
+        # UCI MultiPV: lines reported per iteration; excluded holds the root
+        # moves already reported at the current depth
+        self.multi_pv = 1
+        self.excluded = ()
+        # UCI Move Overhead: ms kept back from every time allocation
+        self.move_overhead = MOVE_OVERHEAD_MS
 
 
 #--------------------------------------------------------------------------------------------------
@@ -263,25 +321,27 @@ PiecePawn = [False, True, False, False, False, False, False, True, False, False,
 class Board:
     __slots__ = ("pieces", "pawns", "king_sq", "side", 
                  "en_passant", "fifty_move", "ply", 
-                 "his_ply", "pos_key", "pce_num", "big_pce", 
-                 "maj_pce", "min_pce", "castle_perm", "history", "p_list",
-                 "material", "pv_table", "pv_array",
+                 "his_ply", "pos_key", "pawn_key", "pce_num", "big_pce", 
+                 "maj_pce", "min_pce", "castle_perm", "history", "rep_keys", "p_list",
+                 "material", "psq_mg", "psq_eg", "phase",
+                 "bitboards", "occupancy",
+                 "pv_table", "pv_array",
                  "search_history", "search_killers")
 
     def __init__(self):
-        self.pieces = [Pieces.EMPTY] * BOARD_SQ_NUM 
+        self.pieces = [EMPTY] * BOARD_SQ_NUM 
         #creates a list of empty squares in the size of the board
 
         self.pawns = [0, 0, 0]
         # bit board for all the pawns, white, black and both
         
-        self.king_sq = [Square.NO_SQ, Square.NO_SQ]
+        self.king_sq = [NO_SQ, NO_SQ]
         # initializes squares for the white and black king
 
-        self.side = Side.WHITE
+        self.side = WHITE
         # sets the first moving team/player as WHITE, as that is the standard rule, can be overridden by ParseFEN
 
-        self.en_passant = Square.NO_SQ
+        self.en_passant = NO_SQ
         # sets the possibility of en-passant to 0, basically invalid
 
         self.fifty_move = 0
@@ -298,6 +358,10 @@ class Board:
         # set as 0 as no pieces have been setup yet
         # used for checking 3 fold repetitions
 
+        self.pawn_key = 0
+        # Zobrist hash over the pawns only, kept alongside self.pawns
+        # indexes the pawn structure cache in evaluate.py
+
         self.pce_num = [0] * 13
         # stores the number of pieces on the board
 
@@ -318,10 +382,17 @@ class Board:
         # it stores '0000' -> no sides can castle
         # discussed in detail with the Class Castling   
 
-        self.history = [Undo() for _ in range (MAX_GAME_MOVES)]
+        self.history = [Undo() for _ in range (HISTORY_CHUNK)]
         # stores all the unique board positions and attributes of each move upto the maximum game moves, for this engine, set to 2048
+        # grown in chunks by grow_history() as the game gets longer
+
+        self.rep_keys = {}
+        # counted multiset of the pos_keys stored in history[:his_ply], kept by make/unmake
+        # a position from before the last pawn move or capture can never come back
+        # (material and pawns only go one way), so "is this key in the multiset"
+        # answers the same question as scanning history back to the last irreversible move
         
-        self.p_list = [[Square.NO_SQ for _ in range (10)] for _ in range (13)]
+        self.p_list = [[NO_SQ for _ in range (10)] for _ in range (13)]
         # Total number of pieces including an empty square can be 13
         # At any given instance, the maximum number of piece of any type can be 10
         # Example - 2 rooks and all pawns promoted to rooks so 2 + 8 = 10
@@ -329,6 +400,86 @@ class Board:
         self.material = [0,0,0]
         # White and Black's material Score
 
+        self.bitboards = [0] * 13
+        # one occupancy bitboard (64-square index) per piece type, kept by make/unmake
+        # feeds the bitboard attack backend (is_sq_attacked, mobility)
+
+        self.occupancy = [0, 0, 0]
+        # all white pieces, all black pieces, and both
+
+        self.psq_mg = 0
+        self.psq_eg = 0
+        self.phase = 0
+        # running eval terms kept by make/unmake (see evaluate.PstMg/PstEg/PhaseInc)
+        # psq_mg/psq_eg -> material + piece-square score, white minus black, midgame/endgame
+        # phase -> unclamped game phase counter (N/B = 1, R = 2, Q = 4)
+
+        self.pv_table = None
+        self.pv_array = None
+        self.search_history = None
+        self.search_killers = None
+        # search-only state (PV table, killers, history heuristic) is allocated
+        # by alloc_search_state() the first time this board is searched
+        # boards used for book loading, move parsing or analysis helpers never pay for it
+
+
+    @classmethod
+    def from_fen(cls, fen):
+        board = cls()
+        board.parse_fen(fen)
+        return board
+
+
+    def copy(self):
+        # Cheap clone of the position (and game history for repetition checks)
+        # The copy starts without search state, like a fresh Board
+        new = Board.__new__(Board)
+        new.pieces = self.pieces[:]
+        new.pawns = self.pawns[:]
+        new.king_sq = self.king_sq[:]
+        new.side = self.side
+        new.en_passant = self.en_passant
+        new.fifty_move = self.fifty_move
+        new.ply = self.ply
+        new.his_ply = self.his_ply
+        new.pos_key = self.pos_key
+        new.pawn_key = self.pawn_key
+        new.pce_num = self.pce_num[:]
+        new.big_pce = self.big_pce[:]
+        new.maj_pce = self.maj_pce[:]
+        new.min_pce = self.min_pce[:]
+        new.castle_perm = self.castle_perm
+        new.history = [
+            Undo(h.move, h.castle_perm, h.en_passant, h.fifty_move, h.pos_key)
+            for h in self.history[:self.his_ply]
+        ]
+        new.history.extend(Undo() for _ in range(HISTORY_CHUNK))
+        new.rep_keys = dict(self.rep_keys)
+        new.p_list = [row[:] for row in self.p_list]
+        new.material = self.material[:]
+        new.bitboards = self.bitboards[:]
+        new.occupancy = self.occupancy[:]
+        new.psq_mg = self.psq_mg
+        new.psq_eg = self.psq_eg
+        new.phase = self.phase
+        new.pv_table = None
+        new.pv_array = None
+        new.search_history = None
+        new.search_killers = None
+        return new
+
+
+    def grow_history(self):
+        # Called by make/null-move when his_ply reaches the end of the stack
+        size = len(self.history)
+        assert size < MAX_GAME_MOVES, "Game history overflow"
+        grow = min(size, MAX_GAME_MOVES - size)
+        self.history.extend(Undo() for _ in range(grow))
+
+
+    def alloc_search_state(self):
+        if self.pv_table is not None:
+            return
         from pvtable import PVTable, InitPvTable
         self.pv_table = PVTable()
         InitPvTable(self.pv_table)
@@ -353,10 +504,10 @@ class Board:
 
 
 
-        for t_pce in [Pieces.wP, Pieces.wN, Pieces.wB, 
-                     Pieces.wR, Pieces.wQ, Pieces.wK,
-                     Pieces.bP, Pieces.bN, Pieces.bB, 
-                     Pieces.bR, Pieces.bQ, Pieces.bK]:
+        for t_pce in [wP, wN, wB, 
+                     wR, wQ, wK,
+                     bP, bN, bB, 
+                     bR, bQ, bK]:
            
            for j in range(self.pce_num[t_pce]):
                sq = self.p_list[t_pce][j]
@@ -367,7 +518,7 @@ class Board:
         for i in range(64):
             sq120 = Sq64to120[i]
             pce = self.pieces[sq120]
-            if pce != Pieces.EMPTY:
+            if pce != EMPTY:
                 col = PieceCol[pce]
                 
                 t_pce_num[pce] += 1
@@ -377,23 +528,56 @@ class Board:
                 t_material[col] += PieceVal[pce]
                 
                 # pawn bitboards for comparison
-                if pce == Pieces.wP:
-                    t_pawns[Side.WHITE] |= (1 << i)
-                    t_pawns[Side.BOTH] |= (1 << i)
-                elif pce == Pieces.bP:
-                    t_pawns[Side.BLACK] |= (1 << i)
-                    t_pawns[Side.BOTH] |= (1 << i)
+                if pce == wP:
+                    t_pawns[WHITE] |= (1 << i)
+                    t_pawns[BOTH] |= (1 << i)
+                elif pce == bP:
+                    t_pawns[BLACK] |= (1 << i)
+                    t_pawns[BOTH] |= (1 << i)
 
         # Compare temporary results with the actual Board state
-        for pce_type in range(Pieces.wP, Pieces.bK + 1):
+        for pce_type in range(wP, bK + 1):
             assert t_pce_num[pce_type] == self.pce_num[pce_type], f"Count mismatch for piece {pce_type}"
 
-        assert t_material[Side.WHITE] == self.material[Side.WHITE], "White material mismatch"
-        assert t_material[Side.BLACK] == self.material[Side.BLACK], "Black material mismatch"
+        assert t_material[WHITE] == self.material[WHITE], "White material mismatch"
+        assert t_material[BLACK] == self.material[BLACK], "Black material mismatch"
+
+        # piece and occupancy bitboards must match the mailbox
+        t_bitboards = [0] * 13
+        t_occupancy = [0, 0, 0]
+        for i in range(64):
+            pce = self.pieces[Sq64to120[i]]
+            if pce != EMPTY:
+                t_bitboards[pce] |= (1 << i)
+                t_occupancy[PieceCol[pce]] |= (1 << i)
+                t_occupancy[BOTH] |= (1 << i)
+        for pce_type in range(wP, bK + 1):
+            assert t_bitboards[pce_type] == self.bitboards[pce_type], f"Bitboard mismatch for piece {pce_type}"
+        assert t_occupancy == self.occupancy, "Occupancy bitboard mismatch"
+        for king_side in (WHITE, BLACK):
+            k_sq = self.king_sq[king_side]
+            if k_sq != NO_SQ and SqOnBoard(k_sq):
+                assert self.is_sq_attacked(k_sq, king_side ^ 1) == self.is_sq_attacked_mailbox(k_sq, king_side ^ 1), \
+                    "Bitboard attack check disagrees with mailbox"
+
+        # incremental eval sums must match a from-scratch recount
+        from evaluate import PstMg, PstEg, PhaseInc
+        t_psq_mg = 0
+        t_psq_eg = 0
+        t_phase = 0
+        for i in range(64):
+            sq120 = Sq64to120[i]
+            pce = self.pieces[sq120]
+            t_psq_mg += PstMg[pce][sq120]
+            t_psq_eg += PstEg[pce][sq120]
+            t_phase += PhaseInc[pce]
+        assert t_psq_mg == self.psq_mg, "Midgame PST sum mismatch"
+        assert t_psq_eg == self.psq_eg, "Endgame PST sum mismatch"
+        assert t_phase == self.phase, "Phase counter mismatch"
         
-        assert t_pawns[Side.WHITE] == self.pawns[Side.WHITE], "White pawn bitboard mismatch"
-        assert t_pawns[Side.BLACK] == self.pawns[Side.BLACK], "Black pawn bitboard mismatch"
-        assert t_pawns[Side.BOTH] == self.pawns[Side.BOTH], "Combined pawn bitboard mismatch"
+        assert t_pawns[WHITE] == self.pawns[WHITE], "White pawn bitboard mismatch"
+        assert t_pawns[BLACK] == self.pawns[BLACK], "Black pawn bitboard mismatch"
+        assert t_pawns[BOTH] == self.pawns[BOTH], "Combined pawn bitboard mismatch"
 
         # verify the Hash Key 
         from hashkeys import generate_pos_key
@@ -401,10 +585,19 @@ class Board:
         if calc != self.pos_key:
             print(f"DEBUG PosKey mismatch!\n  computed: {calc:016X}\n  stored:   {self.pos_key:016X}\n  side: {self.side} (0=WHITE,1=BLACK)\n  en_passant: {self.en_passant}\n  castle_perm: {self.castle_perm}")
             raise AssertionError("PosKey mismatch - engine state is corrupted")
+        from hashkeys import generate_pawn_key
+        assert generate_pawn_key(self) == self.pawn_key, "PawnKey mismatch"
+
+        # the repetition multiset must hold exactly the keys in history
+        t_rep_keys = {}
+        for i in range(self.his_ply):
+            key = self.history[i].pos_key
+            t_rep_keys[key] = t_rep_keys.get(key, 0) + 1
+        assert t_rep_keys == self.rep_keys, "Repetition key multiset mismatch"
         # Side and King positions
-        assert self.side in [Side.WHITE, Side.BLACK]
-        assert self.pieces[self.king_sq[Side.WHITE]] == Pieces.wK
-        assert self.pieces[self.king_sq[Side.BLACK]] == Pieces.bK
+        assert self.side in [WHITE, BLACK]
+        assert self.pieces[self.king_sq[WHITE]] == wK
+        assert self.pieces[self.king_sq[BLACK]] == bK
 
         return True
 
@@ -412,11 +605,11 @@ class Board:
     def reset_board(self):
 
         for i in range(BOARD_SQ_NUM):
-            self.pieces[i] = Square.NO_SQ 
+            self.pieces[i] = NO_SQ 
             # setting all of the squares to OFFBOARD
             
         for i in range(64):
-            self.pieces[Sq64to120[i]] = Pieces.EMPTY
+            self.pieces[Sq64to120[i]] = EMPTY
             # setting the playable squares to empty from OFFBOARD
             # 21 to 98
             
@@ -429,28 +622,37 @@ class Board:
             self.maj_pce[i] = 0
             self.min_pce[i] = 0
             self.material[i] = 0
+        self.psq_mg = 0
+        self.psq_eg = 0
+        self.phase = 0
         # Reset all the pieces and counts
 
         for i in range (3):
             self.pawns[i] = 0
+            self.occupancy[i] = 0
+
+        for i in range(13):
+            self.bitboards[i] = 0
 
             
         for i in range(13):
             for j in range(10):
-                self.p_list[i][j] = Square.NO_SQ
+                self.p_list[i][j] = NO_SQ
                 #clearing the piece list [type of piece and max of 10 pieces]
                 
         # 5. Reset Kings and Game State
-        self.king_sq = [Square.NO_SQ, Square.NO_SQ]
-        self.side = Side.BOTH 
+        self.king_sq = [NO_SQ, NO_SQ]
+        self.side = BOTH 
         # Setting to BOTH as a "null" state
         # hence when the board is set, if the side is still NULL, an illegal postion can be called using the checkboard function
-        self.en_passant = Square.NO_SQ
+        self.en_passant = NO_SQ
         self.fifty_move = 0
         self.ply = 0
         self.his_ply = 0
+        self.rep_keys = {}
         self.castle_perm = 0
         self.pos_key = 0
+        self.pawn_key = 0
 
 
     def update_lists_material(self):
@@ -461,47 +663,64 @@ class Board:
             self.maj_pce[i] = 0
             self.min_pce[i] = 0
             self.pawns[i] = 0 
+            self.occupancy[i] = 0
+        for i in range(13):
+            self.bitboards[i] = 0
 
         self.material = [0, 0, 0]
+
+        from evaluate import PstMg, PstEg, PhaseInc
+        self.psq_mg = 0
+        self.psq_eg = 0
+        self.phase = 0
         
         for i in range(64):
             sq = Sq64to120[i]
             pce = self.pieces[sq]
-            if pce != Pieces.EMPTY:
+            if pce != EMPTY:
                 col = PieceCol[pce]
                 
-                if col != Side.BOTH:
+                if col != BOTH:
                     self.material[col] += PieceVal[pce]
 
+                self.psq_mg += PstMg[pce][sq]
+                self.psq_eg += PstEg[pce][sq]
+                self.phase += PhaseInc[pce]
+
                 # helper arrays to increment counts
                 if PieceBig[pce]: self.big_pce[col] += 1
                 if PieceMaj[pce]: self.maj_pce[col] += 1
                 if PieceMin[pce]: self.min_pce[col] += 1
                 
                 #updates the pawn bitboards
-                if pce == Pieces.wP:
-                    self.pawns[Side.WHITE] |= (1 << i)
-                    self.pawns[Side.BOTH] |= (1 << i)
-                elif pce == Pieces.bP:
-                    self.pawns[Side.BLACK] |= (1 << i)
-                    self.pawns[Side.BOTH] |= (1 << i)
+                if pce == wP:
+                    self.pawns[WHITE] |= (1 << i)
+                    self.pawns[BOTH] |= (1 << i)
+                elif pce == bP:
+                    self.pawns[BLACK] |= (1 << i)
+                    self.pawns[BOTH] |= (1 << i)
+
+                # piece type and occupancy bitboards
+                self.bitboards[pce] |= (1 << i)
+                self.occupancy[col] |= (1 << i)
+                self.occupancy[BOTH] |= (1 << i)
 
                 # Update Piece List: self.p_list[piece_type][index_of_that_piece] = square
                 self.p_list[pce][self.pce_num[pce]] = sq
                 self.pce_num[pce] += 1
                 
                 #Tracks kings
-                if pce == Pieces.wK: self.king_sq[Side.WHITE] = sq
-                if pce == Pieces.bK: self.king_sq[Side.BLACK] = sq
+                if pce == wK: self.king_sq[WHITE] = sq
+                if pce == bK: self.king_sq[BLACK] = sq
 
     def parse_fen(self, fen):
         self.reset_board()
         
         piece_map = {
-            'P': Pieces.wP, 'N': Pieces.wN, 'B': Pieces.wB, 
-            'R': Pieces.wR, 'Q': Pieces.wQ, 'K': Pieces.wK,
-            'p': Pieces.bP, 'n': Pieces.bN, 'b': Pieces.bB, 
-            'r': Pieces.bR, 'q': Pieces.bQ, 'k': Pieces.bK
+            'P': wP, 'N': wN, 'B': wB, 
+            'R': wR, 'Q': wQ, 'K': wK,
+            'p': bP, 'n': bN, 'b': bB, 
+            'r': bR, 'q': bQ, 'k': bK
         }
         # based on the way FEN works, we map our variables with the one in the notation
 
@@ -514,7 +733,7 @@ class Board:
         #split the fen token using FEN rules
 
         # Extraction of the Data from the FEN string
-        rank = Ranks.RANK_8
+        rank = RANK_8
         file = File.FILE_1
 
         for char in placement:
@@ -530,14 +749,14 @@ class Board:
                 file += 1
 
         # Get Side to Move
-        self.side = Side.WHITE if side_to_move == 'w' else Side.BLACK
+        self.side = WHITE if side_to_move == 'w' else BLACK
 
         # Get Castling Permissions
         for char in castling:
-            if char == 'K': self.castle_perm |= Castling.WKSC
-            if char == 'Q': self.castle_perm |= Castling.WQSC
-            if char == 'k': self.castle_perm |= Castling.BKSC
-            if char == 'q': self.castle_perm |= Castling.BQSC
+            if char == 'K': self.castle_perm |= WKSC
+            if char == 'Q': self.castle_perm |= WQSC
+            if char == 'k': self.castle_perm |= BKSC
+            if char == 'q': self.castle_perm |= BQSC
 
         # Get En Passant Square
         if en_passant != '-':
@@ -545,12 +764,54 @@ class Board:
             r = int(en_passant[1]) - 1
             self.en_passant = FR2SQ(f, r)
 
+        # Half-move clock is optional in hand-typed FENs
+        if len(tokens) > 4 and tokens[4].isdigit():
+            self.fifty_move = int(tokens[4])
+
         
         self.update_lists_material()
 
         # Generating a unique position key using the hashkeys function
-        from hashkeys import generate_pos_key
+        from hashkeys import generate_pos_key, generate_pawn_key
         self.pos_key = generate_pos_key(self)
+        self.pawn_key = generate_pawn_key(self)
+
+
+    def to_fen(self):
+        # Inverse of parse_fen, used to ship positions to other processes
+        pce_char = ".PNBRQKpnbrqk"
+        rows = []
+        for rank in range(RANK_8, RANK_1 - 1, -1):
+            row = ""
+            empty = 0
+            for file in range(File.FILE_1, File.FILE_8 + 1):
+                pce = self.pieces[FR2SQ(file, rank)]
+                if pce == EMPTY:
+                    empty += 1
+                    continue
+                if empty:
+                    row += str(empty)
+                    empty = 0
+                row += pce_char[pce]
+            if empty:
+                row += str(empty)
+            rows.append(row)
+
+        castling = ""
+        if self.castle_perm & WKSC: castling += 'K'
+        if self.castle_perm & WQSC: castling += 'Q'
+        if self.castle_perm & BKSC: castling += 'k'
+        if self.castle_perm & BQSC: castling += 'q'
+
+        en_passant = '-'
+        if self.en_passant != NO_SQ:
+            f = (self.en_passant - 21) % 10
+            r = (self.en_passant - 21) // 10
+            en_passant = f"{chr(ord('a') + f)}{r + 1}"
+
+        side = 'w' if self.side == WHITE else 'b'
+        full_move = 1 + self.his_ply // 2
+        return f"{'/'.join(rows)} {side} {castling or '-'} {en_passant} {self.fifty_move} {full_move}"
 
     
     def print_board(self):
@@ -563,7 +824,7 @@ class Board:
             pce_char = ".PNBRQKpnbrqk"
         side_char = "wb-"
         
-        for rank in range(Ranks.RANK_8, Ranks.RANK_1 - 1, -1):
+        for rank in range(RANK_8, RANK_1 - 1, -1):
             line = f"{rank + 1}  " # Print rank number
             for file in range(File.FILE_1, File.FILE_8 + 1):
                 sq = FR2SQ(file, rank)
@@ -579,10 +840,10 @@ class Board:
         
         # Castling Logic: Check bits and print letter or dash
         c = self.castle_perm
-        ksc = 'K' if c & Castling.WKSC else '-'
-        qsc = 'Q' if c & Castling.WQSC else '-'
-        bksc = 'k' if c & Castling.BKSC else '-'
-        bqsc = 'q' if c & Castling.BQSC else '-'
+        ksc = 'K' if c & WKSC else '-'
+        qsc = 'Q' if c & WQSC else '-'
+        bksc = 'k' if c & BKSC else '-'
+        bqsc = 'q' if c & BQSC else '-'
         print(f"Castle: {ksc}{qsc}{bksc}{bqsc}")
         
         print(f"PosKey: {self.pos_key:X}")
@@ -608,33 +869,150 @@ class Board:
 
     def is_sq_attacked(self, sq, side):
 
+        # A pure query: no check_board() here, since check_board() itself
+        # cross-checks this against is_sq_attacked_mailbox().
         assert SqOnBoard(sq)
         assert SideValid(side)
-        if DEBUG_CHECK_BOARD:
-            assert self.check_board()
 
+        sq64 = Sq120to64[sq]
+        bbs = self.bitboards
+        pawn, knight, bishop, rook, queen, king = AttackerPieces[side]
+
+        if PawnAttacks[side ^ 1][sq64] & bbs[pawn]:
+            return True
+        if KnightAttacks[sq64] & bbs[knight]:
+            return True
+        if KingAttacks[sq64] & bbs[king]:
+            return True
+
+        # sliders: only build the blocked ray set if one could reach on an empty board
+        diag = bbs[bishop] | bbs[queen]
+        if diag & BishopRays[sq64] and bishop_attacks(sq64, self.occupancy[BOTH]) & diag:
+            return True
+        straight = bbs[rook] | bbs[queen]
+        if straight & RookRays[sq64] and rook_attacks(sq64, self.occupancy[BOTH]) & straight:
+            return True
+
+        return False
+
+    def attackers_to(self, sq, side, occ):
+        # Bitboard of side's pieces attacking sq with the given occupancy.
+        # Pieces missing from occ are treated as gone, so callers can lift
+        # a king or a captured pawn off the board without touching it.
+        sq64 = Sq120to64[sq]
+        bbs = self.bitboards
+        pawn, knight, bishop, rook, queen, king = AttackerPieces[side]
+
+        attackers = (
+            (PawnAttacks[side ^ 1][sq64] & bbs[pawn])
+            | (KnightAttacks[sq64] & bbs[knight])
+            | (KingAttacks[sq64] & bbs[king])
+        )
+        diag = bbs[bishop] | bbs[queen]
+        if diag & BishopRays[sq64]:
+            attackers |= bishop_attacks(sq64, occ) & diag
+        straight = bbs[rook] | bbs[queen]
+        if straight & RookRays[sq64]:
+            attackers |= rook_attacks(sq64, occ) & straight
+        return attackers & occ
+
+    def see(self, move):
+        # Static exchange evaluation: material the mover nets from the capture
+        # sequence on the target square, both sides always recapturing with
+        # their least valuable attacker and free to stop when behind.
+        from_sq = FROMSQ(move)
+        to_sq = TOSQ(move)
+        attacker = self.pieces[from_sq]
+        occ = self.occupancy[BOTH] ^ SqBB[from_sq]
+
+        if move & MFLAG_EP:
+            captured = wP
+            occ ^= SqBB[to_sq - 10 if PieceCol[attacker] == WHITE else to_sq + 10]
+        else:
+            captured = self.pieces[to_sq]
+
+        gain = PieceVal[captured]
+        promoted = PROMOTED(move)
+        if promoted != EMPTY:
+            gain += PieceVal[promoted] - PieceVal[attacker]
+            attacker = promoted
+
+        return self._see_swap(to_sq, PieceCol[attacker] ^ 1, occ, gain, PieceVal[attacker])
+
+    def see_square(self, sq, side):
+        # SEE of side starting a capture sequence on sq with its cheapest attacker (0 if none)
+        victim = self.pieces[sq]
+        if victim == EMPTY:
+            return 0
+        occ = self.occupancy[BOTH]
+        attackers = self.attackers_to(sq, side, occ)
+        for pce in AttackerPieces[side]:
+            first = attackers & self.bitboards[pce]
+            if first:
+                occ ^= first & -first
+                return self._see_swap(sq, side ^ 1, occ, PieceVal[victim], PieceVal[pce])
+        return 0
+
+    def _see_swap(self, sq, side, occ, first_gain, on_square):
+        # Swap-list core shared by see / see_square. side is to recapture,
+        # on_square the value of the piece it would take.
+        bbs = self.bitboards
+        sq64 = Sq120to64[sq]
+        diag = bbs[wB] | bbs[bB] | bbs[wQ] | bbs[bQ]
+        straight = bbs[wR] | bbs[bR] | bbs[wQ] | bbs[bQ]
+        attackers = self.attackers_to(sq, WHITE, occ) | self.attackers_to(sq, BLACK, occ)
+
+        gains = [first_gain]
+        while True:
+            # speculative: what the last capturer's side keeps if it is taken back
+            gains.append(on_square - gains[-1])
+
+            side_attackers = attackers & self.occupancy[side]
+            if not side_attackers:
+                break
+            for pce in AttackerPieces[side]:
+                first = side_attackers & bbs[pce]
+                if first:
+                    break
+
+            occ ^= first & -first
+            on_square = PieceVal[pce]
+            # lifting a piece can uncover a slider behind it
+            attackers |= (bishop_attacks(sq64, occ) & diag) | (rook_attacks(sq64, occ) & straight)
+            attackers &= occ
+            side ^= 1
+
+        for depth in range(len(gains) - 2, 0, -1):
+            gains[depth - 1] = -max(-gains[depth - 1], gains[depth])
+        return gains[0]
+
+    def is_sq_attacked_mailbox(self, sq, side):
+        # Reference ray-walk over the 120 board; check_board uses it to validate the bitboard path
+
+        assert SqOnBoard(sq)
+        assert SideValid(side)
         pieces = self.pieces
         piece_col = PieceCol
 
         # pawns
-        if side == Side.WHITE:
-            if pieces[sq - 11] == Pieces.wP or pieces[sq - 9] == Pieces.wP:
+        if side == WHITE:
+            if pieces[sq - 11] == wP or pieces[sq - 9] == wP:
                 return True
         else:
-            if pieces[sq + 11] == Pieces.bP or pieces[sq + 9] == Pieces.bP:
+            if pieces[sq + 11] == bP or pieces[sq + 9] == bP:
                 return True
 
         # knights
         for direction in KnDir:
             pce = pieces[sq + direction]
-            if pce != Square.NO_SQ and PceKnight[pce] and piece_col[pce] == side:
+            if pce != NO_SQ and PceKnight[pce] and piece_col[pce] == side:
                 return True
         
         for direction in RkDir:
             t_sq = sq + direction
             pce = pieces[t_sq]
-            while pce != Square.NO_SQ: # While not offboard
-                if pce != Pieces.EMPTY:
+            while pce != NO_SQ: # While not offboard
+                if pce != EMPTY:
                     if PceRookQueen[pce] and piece_col[pce] == side:
                         return True
                     break 
@@ -645,8 +1023,8 @@ class Board:
         for direction in BiDir:
             t_sq = sq + direction
             pce = pieces[t_sq]
-            while pce != Square.NO_SQ:
-                if pce != Pieces.EMPTY:
+            while pce != NO_SQ:
+                if pce != EMPTY:
                     if PceBishopQueen[pce] and piece_col[pce] == side:
                         return True
                     break
@@ -656,7 +1034,7 @@ class Board:
         # Kings
         for direction in KiDir:
             pce = pieces[sq + direction]
-            if pce != Square.NO_SQ and PceKing[pce] and piece_col[pce] == side:
+            if pce != NO_SQ and PceKing[pce] and piece_col[pce] == side:
                 return True
 
         return False
@@ -676,15 +1054,15 @@ def init_sq120tosq64():
     # Here adding 65 to the mapping -> there are only 64 squares on a board, hence 65 is recognizable
     for index in range (BOARD_SQ_NUM):
         Sq120to64[index] = 65
-        FilesBoard [index] = Square.NO_SQ  #NO_SQ is used as an OFFBOARD marker as discussed earlier
-        RanksBoard [index] = Square.NO_SQ #NO_SQ is used as an OFFBOARD marker as discussed earlier
+        FilesBoard [index] = NO_SQ  #NO_SQ is used as an OFFBOARD marker as discussed earlier
+        RanksBoard [index] = NO_SQ #NO_SQ is used as an OFFBOARD marker as discussed earlier
 
     for index in range (64):
         Sq64to120 [index] = 120
     
     # Looping through the valid 64 squares of the board
     sq64 = 0
-    for rank in range (Ranks.RANK_1, Ranks.RANK_8+1):
+    for rank in range (RANK_1, RANK_8+1):
         for file in range (File.FILE_1, File.FILE_8+1):
             sq120 = FR2SQ(file, rank)
 
@@ -706,8 +1084,8 @@ PieceBig = [ False, False, True, True, True, True, True, False, True, True, True
 PieceMaj = [ False, False, False, False, True, True, True, False, False, False, True, True, True ]
 PieceMin = [ False, False, True, True, False, False, False, False, True, True, False, False, False ]
 PieceVal = [ 0, 100, 325, 325, 550, 1000, 50000, 100, 325, 325, 550, 1000, 50000 ]
-PieceCol = [ Side.BOTH, Side.WHITE, Side.WHITE, Side.WHITE, Side.WHITE, Side.WHITE, Side.WHITE,
-             Side.BLACK, Side.BLACK, Side.BLACK, Side.BLACK, Side.BLACK, Side.BLACK ]
+PieceCol = [ BOTH, WHITE, WHITE, WHITE, WHITE, WHITE, WHITE,
+             BLACK, BLACK, BLACK, BLACK, BLACK, BLACK ]
 
 
 # BIT BOARDS
@@ -717,7 +1095,7 @@ PieceCol = [ Side.BOTH, Side.WHITE, Side.WHITE, Side.WHITE, Side.WHITE, Side.WHI
 
 def print_bitboard(bitboard: int):
 
-    for rank in range(Ranks.RANK_8, Ranks.RANK_1 - 1, -1):
+    for rank in range(RANK_8, RANK_1 - 1, -1):
         line = f"{rank + 1}  " # Rank indicator
         for file in range(File.FILE_1, File.FILE_8 + 1):
             sq120 = FR2SQ(file, rank)
@@ -766,3 +1144,142 @@ def pop_bit(bb: int) -> tuple[int, int]:
     bb &= (bb - 1)
     
     return index, bb
+
+
+# BITBOARD ATTACKS
+# Precomputed attack sets indexed by 64-square number, built once by init_bitboard_attacks().
+# Sliders use classical rays: take the ray from the square, find the nearest blocker
+# on it and knock off everything past that blocker with the blocker's own ray.
+
+SqBB = [0] * BOARD_SQ_NUM
+# single-bit board for each 120 square, 0 when offboard
+
+KnightAttacks = [0] * 64
+KingAttacks = [0] * 64
+PawnAttacks = [[0] * 64, [0] * 64]
+# [side][sq64] -> squares a pawn of that side standing on sq64 attacks
+
+RayDir = [1, 10, 9, 11, -1, -10, -9, -11]
+# 0-3 step towards higher square numbers (nearest blocker = lowest bit),
+# 4-7 step towards lower square numbers (nearest blocker = highest bit)
+
+Rays = [[0] * 64 for _ in range(8)]
+RookRays = [0] * 64
+BishopRays = [0] * 64
+# union of the empty-board rays, used as a cheap "can a slider even reach here" test
+
+BetweenBB = [[0] * 64 for _ in range(64)]
+# squares strictly between two aligned squares, 0 when they share no line
+LineBB = [[0] * 64 for _ in range(64)]
+# the full board line through two aligned squares (both included), 0 otherwise
+
+AttackerPieces = (
+    (wP, wN, wB, wR, wQ, wK),
+    (bP, bN, bB, bR, bQ, bK),
+)
+# [side] -> pawn, knight, bishop, rook, queen, king for bitboard indexing
+
+
+def init_bitboard_attacks():
+
+    for sq120 in range(BOARD_SQ_NUM):
+        sq64 = Sq120to64[sq120]
+        SqBB[sq120] = (1 << sq64) if sq64 < 64 else 0
+
+    for sq64 in range(64):
+        sq = Sq64to120[sq64]
+
+        KnightAttacks[sq64] = 0
+        for direction in KnDir:
+            KnightAttacks[sq64] |= SqBB[sq + direction]
+
+        KingAttacks[sq64] = 0
+        for direction in KiDir:
+            KingAttacks[sq64] |= SqBB[sq + direction]
+
+        PawnAttacks[WHITE][sq64] = SqBB[sq + 9] | SqBB[sq + 11]
+        PawnAttacks[BLACK][sq64] = SqBB[sq - 9] | SqBB[sq - 11]
+
+        for index, direction in enumerate(RayDir):
+            ray = 0
+            t_sq = sq + direction
+            while SqBB[t_sq]:
+                ray |= SqBB[t_sq]
+                t_sq += direction
+            Rays[index][sq64] = ray
+
+        RookRays[sq64] = Rays[0][sq64] | Rays[1][sq64] | Rays[4][sq64] | Rays[5][sq64]
+        BishopRays[sq64] = Rays[2][sq64] | Rays[3][sq64] | Rays[6][sq64] | Rays[7][sq64]
+
+    for sq64 in range(64):
+        for index, direction in enumerate(RayDir):
+            line = Rays[index][sq64] | Rays[(index + 4) % 8][sq64] | (1 << sq64)
+            between = 0
+            t_sq = Sq64to120[sq64] + direction
+            while SqBB[t_sq]:
+                t_sq64 = Sq120to64[t_sq]
+                BetweenBB[sq64][t_sq64] = between
+                LineBB[sq64][t_sq64] = line
+                between |= SqBB[t_sq]
+                t_sq += direction
+
+
+def rook_attacks(sq64, occ):
+
+    attacks = 0
+    for index in (0, 1):
+        ray = Rays[index][sq64]
+        blockers = ray & occ
+        if blockers:
+            ray ^= Rays[index][(blockers & -blockers).bit_length() - 1]
+        attacks |= ray
+    for index in (4, 5):
+        ray = Rays[index][sq64]
+        blockers = ray & occ
+        if blockers:
+            ray ^= Rays[index][blockers.bit_length() - 1]
+        attacks |= ray
+    return attacks
+
+
+def bishop_attacks(sq64, occ):
+
+    attacks = 0
+    for index in (2, 3):
+        ray = Rays[index][sq64]
+        blockers = ray & occ
+        if blockers:
+            ray ^= Rays[index][(blockers & -blockers).bit_length() - 1]
+        attacks |= ray
+    for index in (6, 7):
+        ray = Rays[index][sq64]
+        blockers = ray & occ
+        if blockers:
+            ray ^= Rays[index][blockers.bit_length() - 1]
+        attacks |= ray
+    return attacks
+
+
+def piece_attacks(pce, sq64, occ):
+    # Every square the piece on sq64 attacks, own pieces included; pawns give both diagonals
+    if PiecePawn[pce]:
+        return PawnAttacks[PieceCol[pce]][sq64]
+    if PceKnight[pce]:
+        return KnightAttacks[sq64]
+    if PceKing[pce]:
+        return KingAttacks[sq64]
+    if PceRookQueen[pce]:
+        if PceBishopQueen[pce]:
+            return rook_attacks(sq64, occ) | bishop_attacks(sq64, occ)
+        return rook_attacks(sq64, occ)
+    return bishop_attacks(sq64, occ)
+
+
+def bitboard_squares(bb):
+    # 120-square numbers of the set bits, lowest first
+    squares = []
+    while bb:
+        lsb = bb & -bb
+        squares.append(Sq64to120[lsb.bit_length() - 1])
+        bb ^= lsb
+    return squares
@@ -1,15 +1,20 @@
+from array import array
+
 from defs import (
-    Pieces,
-    Side,
-    Square,
+    BOARD_SQ_NUM,
+    FR2SQ,
     Sq120to64,
+    Sq64to120,
     FilesBoard,
     RanksBoard,
     PieceCol,
-    KnDir,
-    BiDir,
-    RkDir,
     KiDir,
+    piece_attacks,
+)
+from consts import (
+    WHITE, BLACK, BOTH, NO_SQ,
+    wP, wN, wB, wR, wQ, wK,
+    bP, bN, bB, bR, bQ, bK,
 )
 
 
@@ -102,39 +107,147 @@ KingTableEG = [
 ]
 
 PieceValue = {
-    Pieces.wP: 100, Pieces.bP: 100,
-    Pieces.wN: 320, Pieces.bN: 320,
-    Pieces.wB: 330, Pieces.bB: 330,
-    Pieces.wR: 500, Pieces.bR: 500,
-    Pieces.wQ: 900, Pieces.bQ: 900,
+    wP: 100, bP: 100,
+    wN: 320, bN: 320,
+    wB: 330, bB: 330,
+    wR: 500, bR: 500,
+    wQ: 900, bQ: 900,
 }
 
 PhaseValue = {
-    Pieces.wN: 1, Pieces.bN: 1,
-    Pieces.wB: 1, Pieces.bB: 1,
-    Pieces.wR: 2, Pieces.bR: 2,
-    Pieces.wQ: 4, Pieces.bQ: 4,
+    wN: 1, bN: 1,
+    wB: 1, bB: 1,
+    wR: 2, bR: 2,
+    wQ: 4, bQ: 4,
 }
 
 PASSED_PAWN_BONUS = [0, 5, 12, 22, 35, 55, 80, 0]
 
 MOBILITY_MG = {
-    Pieces.wN: 4, Pieces.bN: 4,
-    Pieces.wB: 4, Pieces.bB: 4,
-    Pieces.wR: 2, Pieces.bR: 2,
-    Pieces.wQ: 1, Pieces.bQ: 1,
+    wN: 4, bN: 4,
+    wB: 4, bB: 4,
+    wR: 2, bR: 2,
+    wQ: 1, bQ: 1,
 }
 MOBILITY_EG = {
-    Pieces.wN: 2, Pieces.bN: 2,
-    Pieces.wB: 3, Pieces.bB: 3,
-    Pieces.wR: 2, Pieces.bR: 2,
-    Pieces.wQ: 1, Pieces.bQ: 1,
+    wN: 2, bN: 2,
+    wB: 3, bB: 3,
+    wR: 2, bR: 2,
+    wQ: 1, bQ: 1,
 }
 
 
+# Incremental eval tables, indexed [piece][sq120], signed (white +, black -).
+# PstMg/PstEg fold material and piece-square value together; PhaseInc is the
+# per-piece phase weight. ClearPiece/AddPiece/MovePiece keep pos.psq_mg,
+# pos.psq_eg and pos.phase as running sums of these, so EvalPosition never
+# has to walk the piece lists for the static terms.
+PstMg = [[0] * BOARD_SQ_NUM for _ in range(13)]
+PstEg = [[0] * BOARD_SQ_NUM for _ in range(13)]
+PhaseInc = [0] * 13
+
+
+def InitEvalTables():
+    for piece in range(wP, bK + 1):
+        sign = 1 if piece <= wK else -1
+        value = PieceValue.get(piece, 0)
+        PhaseInc[piece] = PhaseValue.get(piece, 0)
+        for sq64 in range(64):
+            sq120 = Sq64to120[sq64]
+            PstMg[piece][sq120] = sign * (value + _piece_square(piece, sq120, mg=True))
+            PstEg[piece][sq120] = sign * (value + _piece_square(piece, sq120, mg=False))
+
+
+# Pawn hash: pawn structure changes rarely in the tree, so its (mg, eg) score
+# is cached by pos.pawn_key (a Zobrist key over pawns only, kept by make/unmake).
+# Each entry also remembers the king squares it last saw and the king shield
+# bonuses for them, so the shield scan is skipped while the kings stay put.
+DEFAULT_PAWN_HASH_SIZE_MB = 1
+# key (U64) + mg/eg (int32 each) + king squares (2 bytes) + shield bonuses (2 bytes)
+PAWN_HASH_ENTRY_BYTES = 8 + 4 + 4 + 2 + 2
+
+
+class PawnHashTable:
+    __slots__ = ("keys", "mg", "eg", "king_sqs", "shields", "num_entries", "hits", "misses")
+
+    def __init__(self):
+        self.keys = array("Q")
+        self.mg = array("i")
+        self.eg = array("i")
+        self.king_sqs = array("B")
+        self.shields = array("B")
+        self.num_entries = 0
+        self.hits = 0
+        self.misses = 0
+
+
+def InitPawnHash(table, size_mb=DEFAULT_PAWN_HASH_SIZE_MB):
+    num_entries = int(size_mb * 1024 * 1024) // PAWN_HASH_ENTRY_BYTES
+    if num_entries < 1:
+        num_entries = 1
+    table.num_entries = num_entries
+    ClearPawnHash(table)
+
+
+def ClearPawnHash(table):
+    n = table.num_entries
+    table.keys = array("Q", bytes(8 * n))
+    table.mg = array("i", bytes(4 * n))
+    table.eg = array("i", bytes(4 * n))
+    table.king_sqs = array("B", bytes(2 * n))
+    table.shields = array("B", bytes(2 * n))
+    table.hits = 0
+    table.misses = 0
+
+
+PawnHash = PawnHashTable()
+InitPawnHash(PawnHash)
+
+
+# Eval cache: direct-mapped on pos.pos_key, holding the final side-to-move
+# score. The same positions get evaluated again across iterations, across
+# searches, and by the persona/learner layers, which all go through
+# EvalPosition and so share it. The eval is a pure function of the position,
+# so entries never go stale; a new slot simply overwrites the old one.
+DEFAULT_EVAL_HASH_SIZE_MB = 2
+# key (U64) + score (int32)
+EVAL_HASH_ENTRY_BYTES = 8 + 4
+
+
+class EvalHashTable:
+    __slots__ = ("keys", "scores", "num_entries", "hits", "misses")
+
+    def __init__(self):
+        self.keys = array("Q")
+        self.scores = array("i")
+        self.num_entries = 0
+        self.hits = 0
+        self.misses = 0
+
+
+def InitEvalHash(table, size_mb=DEFAULT_EVAL_HASH_SIZE_MB):
+    num_entries = int(size_mb * 1024 * 1024) // EVAL_HASH_ENTRY_BYTES
+    if num_entries < 1:
+        num_entries = 1
+    table.num_entries = num_entries
+    ClearEvalHash(table)
+
+
+def ClearEvalHash(table):
+    n = table.num_entries
+    table.keys = array("Q", bytes(8 * n))
+    table.scores = array("i", bytes(4 * n))
+    table.hits = 0
+    table.misses = 0
+
+
+EvalHash = EvalHashTable()
+InitEvalHash(EvalHash)
+
+
 def _sq64_mirrored(piece, sq120):
     sq64 = Sq120to64[sq120]
-    if piece >= Pieces.bP:
+    if piece >= bP:
         return Mirror64[sq64]
     return sq64
 
@@ -142,67 +255,37 @@ def _sq64_mirrored(piece, sq120):
 def _piece_square(piece, sq120, mg=True):
     sq = _sq64_mirrored(piece, sq120)
 
-    if piece in (Pieces.wP, Pieces.bP):
+    if piece in (wP, bP):
         return PawnTable[sq]
-    if piece in (Pieces.wN, Pieces.bN):
+    if piece in (wN, bN):
         return KnightTable[sq]
-    if piece in (Pieces.wB, Pieces.bB):
+    if piece in (wB, bB):
         return BishopTable[sq]
-    if piece in (Pieces.wR, Pieces.bR):
+    if piece in (wR, bR):
         return RookTable[sq]
-    if piece in (Pieces.wQ, Pieces.bQ):
+    if piece in (wQ, bQ):
         return QueenTable[sq]
-    if piece in (Pieces.wK, Pieces.bK):
+    if piece in (wK, bK):
         return KingTableMG[sq] if mg else KingTableEG[sq]
     return 0
 
 
 def _mobility_for_piece(pos, sq, piece):
-    own = PieceCol[piece]
-    pieces = pos.pieces
-    mob = 0
-
-    if piece in (Pieces.wN, Pieces.bN):
-        for d in KnDir:
-            t = sq + d
-            p = pieces[t]
-            if p != Square.NO_SQ and (p == Pieces.EMPTY or PieceCol[p] != own):
-                mob += 1
-        return mob
-
-    if piece in (Pieces.wB, Pieces.bB, Pieces.wR, Pieces.bR, Pieces.wQ, Pieces.bQ):
-        dirs = []
-        if piece in (Pieces.wB, Pieces.bB, Pieces.wQ, Pieces.bQ):
-            dirs += BiDir
-        if piece in (Pieces.wR, Pieces.bR, Pieces.wQ, Pieces.bQ):
-            dirs += RkDir
-        for d in dirs:
-            t = sq + d
-            p = pieces[t]
-            while p != Square.NO_SQ:
-                if p == Pieces.EMPTY:
-                    mob += 1
-                else:
-                    if PieceCol[p] != own:
-                        mob += 1
-                    break
-                t += d
-                p = pieces[t]
-        return mob
-
-    return 0
+    # Pseudo-attacked squares not holding an own piece, from the board's bitboards
+    attacks = piece_attacks(piece, Sq120to64[sq], pos.occupancy[BOTH])
+    return (attacks & ~pos.occupancy[PieceCol[piece]]).bit_count()
 
 
 def _collect_pawns_by_file(pos):
     white_files = [[] for _ in range(8)]
     black_files = [[] for _ in range(8)]
 
-    for i in range(pos.pce_num[Pieces.wP]):
-        sq = pos.p_list[Pieces.wP][i]
+    for i in range(pos.pce_num[wP]):
+        sq = pos.p_list[wP][i]
         white_files[FilesBoard[sq]].append(RanksBoard[sq])
 
-    for i in range(pos.pce_num[Pieces.bP]):
-        sq = pos.p_list[Pieces.bP][i]
+    for i in range(pos.pce_num[bP]):
+        sq = pos.p_list[bP][i]
         black_files[FilesBoard[sq]].append(RanksBoard[sq])
 
     return white_files, black_files
@@ -275,34 +358,70 @@ def _king_shield_bonus(pos, side):
     if f < 0 or f > 7 or r < 0 or r > 7:
         return 0
 
-    if side == Side.WHITE:
-        pawn = Pieces.wP
+    if side == WHITE:
+        pawn = wP
         rr1 = r + 1
         rr2 = r + 2
     else:
-        pawn = Pieces.bP
+        pawn = bP
         rr1 = r - 1
         rr2 = r - 2
 
+    pieces = pos.pieces
     bonus = 0
     for ff in (f - 1, f, f + 1):
         if ff < 0 or ff > 7:
             continue
-        for sq in range(21, 99):
-            if FilesBoard[sq] == ff and RanksBoard[sq] == rr1 and pos.pieces[sq] == pawn:
-                bonus += 12
-            if FilesBoard[sq] == ff and RanksBoard[sq] == rr2 and pos.pieces[sq] == pawn:
-                bonus += 6
+        if 0 <= rr1 <= 7 and pieces[FR2SQ(ff, rr1)] == pawn:
+            bonus += 12
+        if 0 <= rr2 <= 7 and pieces[FR2SQ(ff, rr2)] == pawn:
+            bonus += 6
     return bonus
 
 
+def _probe_pawn_hash(pos):
+    """
+    Returns (mg, eg, white_shield, black_shield) for the current pawn
+    structure, filling the pawn hash entry on a miss.
+    """
+    table = PawnHash
+    key = pos.pawn_key
+    index = key % table.num_entries
+    k_index = index * 2
+    wk = pos.king_sq[WHITE]
+    bk = pos.king_sq[BLACK]
+
+    if table.keys[index] == key:
+        table.hits += 1
+        king_sqs = table.king_sqs
+        if king_sqs[k_index] != wk or king_sqs[k_index + 1] != bk:
+            king_sqs[k_index] = wk
+            king_sqs[k_index + 1] = bk
+            table.shields[k_index] = _king_shield_bonus(pos, WHITE)
+            table.shields[k_index + 1] = _king_shield_bonus(pos, BLACK)
+        return table.mg[index], table.eg[index], table.shields[k_index], table.shields[k_index + 1]
+
+    table.misses += 1
+    mg, eg = _pawn_structure_score(pos)
+    w_shield = _king_shield_bonus(pos, WHITE)
+    b_shield = _king_shield_bonus(pos, BLACK)
+    table.keys[index] = key
+    table.mg[index] = mg
+    table.eg[index] = eg
+    table.king_sqs[k_index] = wk
+    table.king_sqs[k_index + 1] = bk
+    table.shields[k_index] = w_shield
+    table.shields[k_index + 1] = b_shield
+    return mg, eg, w_shield, b_shield
+
+
 def _king_attack_pressure(pos, king_side):
-    enemy = Side.BLACK if king_side == Side.WHITE else Side.WHITE
+    enemy = BLACK if king_side == WHITE else WHITE
     king_sq = pos.king_sq[king_side]
     zone = [king_sq]
     for d in KiDir:
         t = king_sq + d
-        if pos.pieces[t] != Square.NO_SQ:
+        if pos.pieces[t] != NO_SQ:
             zone.append(t)
 
     attacks = 0
@@ -312,16 +431,14 @@ def _king_attack_pressure(pos, king_side):
     return attacks
 
 
-def _king_safety_score(pos):
+def _king_safety_score(pos, w_shield, b_shield):
     mg = 0
     eg = 0
 
-    w_shield = _king_shield_bonus(pos, Side.WHITE)
-    b_shield = _king_shield_bonus(pos, Side.BLACK)
     mg += w_shield - b_shield
 
-    w_pressure = _king_attack_pressure(pos, Side.WHITE)
-    b_pressure = _king_attack_pressure(pos, Side.BLACK)
+    w_pressure = _king_attack_pressure(pos, WHITE)
+    b_pressure = _king_attack_pressure(pos, BLACK)
     mg += (b_pressure - w_pressure) * 10
     eg += (b_pressure - w_pressure) * 3
 
@@ -329,9 +446,7 @@ def _king_safety_score(pos):
 
 
 def _phase(pos):
-    phase = 0
-    for p, v in PhaseValue.items():
-        phase += pos.pce_num[p] * v
+    phase = pos.phase
     if phase < 0:
         phase = 0
     if phase > 24:
@@ -339,43 +454,55 @@ def _phase(pos):
     return phase
 
 
-def EvalPosition(pos):
-    mg = 0
-    eg = 0
-
-    # Material + PST + mobility + bishop pair
-    for piece in (
-        Pieces.wP, Pieces.wN, Pieces.wB, Pieces.wR, Pieces.wQ, Pieces.wK,
-        Pieces.bP, Pieces.bN, Pieces.bB, Pieces.bR, Pieces.bQ, Pieces.bK,
-    ):
-        sign = 1 if piece <= Pieces.wK else -1
-        for i in range(pos.pce_num[piece]):
-            sq = pos.p_list[piece][i]
-            if piece in PieceValue:
-                mg += sign * PieceValue[piece]
-                eg += sign * PieceValue[piece]
+MOBILITY_PIECES = (
+    wN, wB, wR, wQ,
+    bN, bB, bR, bQ,
+)
 
-            mg += sign * _piece_square(piece, sq, mg=True)
-            eg += sign * _piece_square(piece, sq, mg=False)
 
-            if piece in MOBILITY_MG:
-                mob = _mobility_for_piece(pos, sq, piece)
-                mg += sign * mob * MOBILITY_MG[piece]
-                eg += sign * mob * MOBILITY_EG[piece]
+def EvalPosition(pos):
+    table = EvalHash
+    key = pos.pos_key
+    index = key % table.num_entries
+    if table.keys[index] == key:
+        table.hits += 1
+        return table.scores[index]
+
+    table.misses += 1
+    score = _evaluate(pos)
+    table.keys[index] = key
+    table.scores[index] = score
+    return score
+
+
+def _evaluate(pos):
+    # Material + PST are maintained incrementally by make/unmake.
+    mg = pos.psq_mg
+    eg = pos.psq_eg
+
+    # Mobility + bishop pair
+    for piece in MOBILITY_PIECES:
+        sign = 1 if piece <= wK else -1
+        mob_mg = MOBILITY_MG[piece]
+        mob_eg = MOBILITY_EG[piece]
+        for i in range(pos.pce_num[piece]):
+            mob = _mobility_for_piece(pos, pos.p_list[piece][i], piece)
+            mg += sign * mob * mob_mg
+            eg += sign * mob * mob_eg
 
     # Bishop pair
-    if pos.pce_num[Pieces.wB] >= 2:
+    if pos.pce_num[wB] >= 2:
         mg += 35
         eg += 45
-    if pos.pce_num[Pieces.bB] >= 2:
+    if pos.pce_num[bB] >= 2:
         mg -= 35
         eg -= 45
 
-    p_mg, p_eg = _pawn_structure_score(pos)
+    p_mg, p_eg, w_shield, b_shield = _probe_pawn_hash(pos)
     mg += p_mg
     eg += p_eg
 
-    k_mg, k_eg = _king_safety_score(pos)
+    k_mg, k_eg = _king_safety_score(pos, w_shield, b_shield)
     mg += k_mg
     eg += k_eg
 
@@ -384,5 +511,5 @@ def EvalPosition(pos):
     score = (mg * phase + eg * (24 - phase)) // 24
 
     # Side-to-move perspective
-    return score if pos.side == Side.WHITE else -score
+    return score if pos.side == WHITE else -score
 
@@ -1,46 +1,82 @@
 import random
 from defs import *
 
-# Arrays to hold random numbers
-PieceKeys = [[0 for _ in range(BOARD_SQ_NUM)] for _ in range(13)]
+KEY_MASK = (1 << 64) - 1
+
+# Arrays to hold random numbers, all flat and precomputed:
+#   PieceKeys[piece * 120 + sq] -> one lookup per piece move (EMPTY's row stays 0)
+#   EpKeys[sq]                  -> the key of the en-passant square's file
+#                                  (0 for NO_SQ, so hashing "no ep square" is a no-op)
+#   CastleKeys[perm]            -> XOR of the keys for every right set in perm
+PieceKeys = [0] * (13 * BOARD_SQ_NUM)
 SideKey = 0
-CastleKeys = [0 for _ in range(16)]
+EpFileKeys = [0] * 8
+EpKeys = [0] * BOARD_SQ_NUM
+CastleRightKeys = [0] * 4
+CastleKeys = [0] * 16
+
+
+def _rand64():
+    return random.getrandbits(64) & KEY_MASK
+
 
 def init_hash_keys():
     global SideKey
     random.seed(1070372)
-    
-    for i in range(13):
-        for j in range(BOARD_SQ_NUM):
-            PieceKeys[i][j] = random.getrandbits(64)
-            
-    SideKey = random.getrandbits(64)
-    
-    for i in range(16):
-        CastleKeys[i] = random.getrandbits(64)
+
+    for pce in range(wP, bK + 1):
+        for sq in range(BOARD_SQ_NUM):
+            PieceKeys[pce * BOARD_SQ_NUM + sq] = _rand64()
+
+    SideKey = _rand64()
+
+    for f in range(8):
+        EpFileKeys[f] = _rand64()
+    for sq in range(BOARD_SQ_NUM):
+        EpKeys[sq] = 0
+    for r in range(8):
+        for f in range(8):
+            EpKeys[FR2SQ(f, r)] = EpFileKeys[f]
+
+    for i in range(4):
+        CastleRightKeys[i] = _rand64()
+    for perm in range(16):
+        key = 0
+        for i in range(4):
+            if perm & (1 << i):
+                key ^= CastleRightKeys[i]
+        CastleKeys[perm] = key
 
 
 def generate_pos_key(board):
     """Return the Zobrist hash for the given board object."""
     final_key = 0
 
-    # Pieces on squares
-    for sq in range(BOARD_SQ_NUM):
-        piece = board.pieces[sq]
-        if piece != Square.NO_SQ and piece != Pieces.EMPTY:
-            # Piece is an IntEnum value that indexes PieceKeys
-            final_key ^= PieceKeys[piece][sq]
+    # Pieces, straight from the piece lists
+    for pce in range(wP, bK + 1):
+        base = pce * BOARD_SQ_NUM
+        p_list = board.p_list[pce]
+        for i in range(board.pce_num[pce]):
+            final_key ^= PieceKeys[base + p_list[i]]
 
     # Side to move: XOR SideKey only if BLACK to move
     # (Side.BLACK == 1, Side.WHITE == 0)
-    if board.side == Side.BLACK:
+    if board.side == BLACK:
         final_key ^= SideKey
 
-    # En Passant: use the EMPTY row's key for the EP square itself
-    if board.en_passant != Square.NO_SQ:
-        final_key ^= PieceKeys[Pieces.EMPTY][board.en_passant]
+    # En Passant: keyed by file, NO_SQ maps to 0
+    final_key ^= EpKeys[board.en_passant]
 
     # Castling permissions
     final_key ^= CastleKeys[board.castle_perm]
 
-    return final_key
\ No newline at end of file
+    return final_key
+
+def generate_pawn_key(board):
+    """Return the pawn-only Zobrist hash (pawn hash table index) for the board."""
+    final_key = 0
+    for pce in (wP, bP):
+        base = pce * BOARD_SQ_NUM
+        for i in range(board.pce_num[pce]):
+            final_key ^= PieceKeys[base + board.p_list[pce][i]]
+    return final_key
@@ -15,18 +15,20 @@ from defs import (
 from evaluate import EvalPosition
 from book import get_book_move, load_opening_book
 from make_mov import MakeMove, TakeMove
-from move_gen import GenerateAllMoves, MoveList
+from move_gen import GenerateLegalMoves, MoveList
 from move_io import ParseMove, PrMove
-from search import IterativeDeepening
+from search import IterativeDeepening, RootSplitSearch, ClearForNewGame
 from persona_trace import choose_trace_personality_move, infer_target_elo
 from predictions import build_move_feedback
 import math
 import os
+import threading
 from datetime import datetime
 
 START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
 BOOK_ENABLED = True
 LEARNER_GUIDE_ENABLED = False
+PONDER_ENABLED = True
 BORDER_EQ = "=" * 66
 BORDER_DASH = "-" * 66
 
@@ -311,18 +313,16 @@ def _move_disambiguation(board, move, piece):
     to_sq = TOSQ(move)
     conflicts = []
     move_list = MoveList()
-    GenerateAllMoves(board, move_list)
+    GenerateLegalMoves(board, move_list)
     for i in range(move_list.count):
-        other = move_list.moves[i].move
+        other = move_list.moves[i]
         if other == move:
             continue
         if TOSQ(other) != to_sq:
             continue
         if board.pieces[FROMSQ(other)] != piece:
             continue
-        if MakeMove(board, other):
-            TakeMove(board)
-            conflicts.append(FROMSQ(other))
+        conflicts.append(FROMSQ(other))
 
     if not conflicts:
         return ""
@@ -385,13 +385,8 @@ def load_fen_interactive(board):
 
 def count_legal_moves(board):
     move_list = MoveList()
-    GenerateAllMoves(board, move_list)
-    legal = 0
-    for i in range(move_list.count):
-        if MakeMove(board, move_list.moves[i].move):
-            legal += 1
-            TakeMove(board)
-    return legal
+    GenerateLegalMoves(board, move_list)
+    return move_list.count
 
 def terminal_result(board):
     legal = count_legal_moves(board)
@@ -469,7 +464,7 @@ class GameRecorder:
         return path
 
 # ---- Search Integration ----
-def run_search(board, depth, movetime_ms, verbose=False):
+def run_search(board, depth, movetime_ms, verbose=False, workers=1):
     if BOOK_ENABLED:
         book_move = get_book_move(board)
         if book_move != 0:
@@ -481,11 +476,21 @@ def run_search(board, depth, movetime_ms, verbose=False):
                 "nodes": 0,
                 "cutoffs": 0,
                 "first_cutoffs": 0,
+                "eval_hits": 0,
+                "eval_misses": 0,
                 "stopped": 0,
                 "quit": 0,
                 "pv": [PrMove(book_move)],
                 "book": True,
             }
+    if workers > 1:
+        return RootSplitSearch(
+            board,
+            max_depth=depth,
+            workers=workers,
+            time_limit_ms=movetime_ms,
+            verbose=verbose,
+        )
     return IterativeDeepening(
         board,
         max_depth=depth,
@@ -495,15 +500,9 @@ def run_search(board, depth, movetime_ms, verbose=False):
     )
 
 def collect_legal_moves(board):
-    legal_moves = []
     move_list = MoveList()
-    GenerateAllMoves(board, move_list)
-    for i in range(move_list.count):
-        move = move_list.moves[i].move
-        if MakeMove(board, move):
-            legal_moves.append(move)
-            TakeMove(board)
-    return legal_moves
+    GenerateLegalMoves(board, move_list)
+    return list(move_list.moves[:move_list.count])
 
 def is_endgame_position(board):
     white_heavy = board.pce_num[4] + board.pce_num[5]
@@ -527,8 +526,9 @@ def _development_bonus(board, move):
         return 0.6
     return 0.0
 
-def choose_humanized_move(board, depth, movetime_ms, personality):
-    base_result = run_search(board, depth, movetime_ms, verbose=False)
+def choose_humanized_move(board, depth, movetime_ms, personality, base_result=None):
+    if base_result is None:
+        base_result = run_search(board, depth, movetime_ms, verbose=False)
     if base_result["best_move"] == 0:
         return 0, {
             "book": base_result.get("book", False),
@@ -560,6 +560,53 @@ def choose_humanized_move(board, depth, movetime_ms, personality):
     meta["pv"] = base_result.get("pv", [])
     return move, meta
 
+# ---- Pondering ----
+# While input() waits for the human, a background thread searches the position
+# after the reply the engine's PV expects. It fills the shared TT, so even a
+# wrong guess leaves the next search warm; when the guess was right and the
+# ponder search finished, its result is used as the engine's search.
+# The search tables are module globals, so the ponder thread must be stopped
+# before the main thread searches, generates moves or evaluates anything.
+def start_pondering(board, depth, pv):
+    if not PONDER_ENABLED or len(pv) < 2:
+        return None
+    ponder_board = board.copy()
+    move = ParseMove(pv[1], ponder_board)
+    if move == 0 or not MakeMove(ponder_board, move):
+        return None
+    ponder_board.ply = 0
+    if BOOK_ENABLED and get_book_move(ponder_board) != 0:
+        return None
+
+    ponder = {"move": move, "stop": threading.Event(), "result": None}
+
+    def run():
+        ponder["result"] = IterativeDeepening(
+            ponder_board,
+            max_depth=depth,
+            stdin_enabled=False,
+            verbose=False,
+            stop_event=ponder["stop"],
+        )
+
+    ponder["thread"] = threading.Thread(target=run, name="hydra-ponder", daemon=True)
+    ponder["thread"].start()
+    return ponder
+
+def stop_pondering(ponder):
+    """
+    Stops a ponder search and returns (expected_move, result); result is
+    None unless the search completed its full depth.
+    """
+    if ponder is None:
+        return 0, None
+    ponder["stop"].set()
+    ponder["thread"].join()
+    result = ponder["result"]
+    if result is None or result["stopped"] or result["best_move"] == 0:
+        return ponder["move"], None
+    return ponder["move"], result
+
 def assess_player_move(board, move, depth, movetime_ms):
     analysis_depth = max(2, min(depth, 4))
     analysis_time = 0 if movetime_ms == 0 else min(movetime_ms, 1200)
@@ -645,6 +692,10 @@ def print_search_result(result, side_to_move):
     print_minor_divider("Search Stats")
     print(f"Depth reached: {result['completed_depth']}")
     print(f"Nodes: {result['nodes']}")
+    eval_hits = result.get("eval_hits", 0)
+    eval_probes = eval_hits + result.get("eval_misses", 0)
+    if eval_probes > 0:
+        print(f"Eval cache: {eval_hits}/{eval_probes} hits ({eval_hits * 100.0 / eval_probes:.1f}%)")
     print_minor_divider("Principal Variation")
     print(f"Best line (PV): {pv_text}")
 
@@ -653,6 +704,7 @@ def analyze_best_move_only():
     fen = load_fen_interactive(board)
     depth = ask_int("Search depth", 5)
     movetime_ms = ask_int("Move time (ms, 0 means depth-only)", 0, 0)
+    workers = ask_int("Worker processes (1 = single search)", 1)
 
     print("\nLoaded position:")
     board.print_board()
@@ -660,7 +712,7 @@ def analyze_best_move_only():
     print(f"\nFEN: {fen}")
     print("\nAnalyzing best move...")
 
-    result = run_search(board, depth, movetime_ms, verbose=False)
+    result = run_search(board, depth, movetime_ms, verbose=False, workers=workers)
     print("\nSearch result")
     print_search_result(result, board.side)
 
@@ -669,6 +721,7 @@ def evaluate_position_and_line():
     fen = load_fen_interactive(board)
     depth = ask_int("Search depth", 5)
     movetime_ms = ask_int("Move time (ms, 0 means depth-only)", 0, 0)
+    workers = ask_int("Worker processes (1 = single search)", 1)
 
     print("\nLoaded position:")
     board.print_board()
@@ -679,13 +732,14 @@ def evaluate_position_and_line():
     print(f"Static eval (cp, side-to-move perspective): {static_eval}")
 
     print("Searching for best sequence...")
-    result = run_search(board, depth, movetime_ms, verbose=False)
+    result = run_search(board, depth, movetime_ms, verbose=False, workers=workers)
     print("\nEvaluation + best sequence")
     print_search_result(result, board.side)
 
 def play_game_vs_engine():
     board = Board()
     fen = load_fen_interactive(board)
+    ClearForNewGame(board)
     side_choice = input("Choose a side: White or Black? (w/b) [w]: ").strip().lower()
     human_side = Side.BLACK if side_choice == "b" else Side.WHITE
     engine_side = Side.BLACK if human_side == Side.WHITE else Side.WHITE
@@ -707,6 +761,8 @@ def play_game_vs_engine():
     tracked_engine_ideas = []
     game_result = "*"
     game_reason = "unfinished"
+    ponder_pv = []
+    pondered = None
 
     while True:
         board.print_board()
@@ -719,7 +775,9 @@ def play_game_vs_engine():
             break
 
         if board.side == human_side:
+            ponder = start_pondering(board, depth, ponder_pv)
             user_text = input("Your move (e2e4, q=quit): ").strip().lower()
+            ponder_move, ponder_result = stop_pondering(ponder)
             if user_text in ("q", "quit", "exit"):
                 print("Game ended.")
                 game_result = "*"
@@ -747,6 +805,7 @@ def play_game_vs_engine():
 
             recorder.add_move(board, move)
             MakeMove(board, move)
+            pondered = ponder_result if move == ponder_move else None
             print(f"You played: {PrMove(move)}")
             print_major_divider()
             if LEARNER_GUIDE_ENABLED and learner_feedback:
@@ -754,8 +813,14 @@ def play_game_vs_engine():
                 tracked_human_ideas = learner_feedback.get("own_ideas", [])
                 tracked_engine_ideas = learner_feedback.get("enemy_ideas", [])
         else:
-            print("Engine thinking...")
-            result = run_search(board, depth, movetime_ms, verbose=False)
+            if pondered is not None:
+                print("Engine thinking... (ponder hit)")
+                result = pondered
+            else:
+                print("Engine thinking...")
+                result = run_search(board, depth, movetime_ms, verbose=False)
+            pondered = None
+            ponder_pv = result.get("pv", [])
             best_move = result["best_move"]
             if best_move == 0:
                 print("Engine has no legal moves.")
@@ -799,6 +864,7 @@ def play_game_vs_engine():
 def play_game_vs_humanized_bot():
     board = Board()
     fen = load_fen_interactive(board)
+    ClearForNewGame(board)
     side_choice = input("Choose your side: White or Black? (w/b) [w]: ").strip().lower()
     human_side = Side.BLACK if side_choice == "b" else Side.WHITE
     engine_side = Side.BLACK if human_side == Side.WHITE else Side.WHITE
@@ -836,6 +902,8 @@ def play_game_vs_humanized_bot():
     tracked_engine_ideas = []
     game_result = "*"
     game_reason = "unfinished"
+    ponder_pv = []
+    pondered = None
 
     while True:
         board.print_board()
@@ -848,7 +916,9 @@ def play_game_vs_humanized_bot():
             break
 
         if board.side == human_side:
+            ponder = start_pondering(board, depth, ponder_pv)
             user_text = input("Your move (e2e4, q=quit): ").strip().lower()
+            ponder_move, ponder_result = stop_pondering(ponder)
             if user_text in ("q", "quit", "exit"):
                 print("Game ended.")
                 game_result = "*"
@@ -881,6 +951,7 @@ def play_game_vs_humanized_bot():
 
             recorder.add_move(board, move)
             MakeMove(board, move)
+            pondered = ponder_result if move == ponder_move else None
             print(f"You played: {PrMove(move)}")
             print_major_divider()
             if LEARNER_GUIDE_ENABLED and learner_feedback:
@@ -910,7 +981,10 @@ def play_game_vs_humanized_bot():
                     f"adaptive target elo: {tracker.current_elo}, "
                     f"avg player loss: {tracker.avg_loss:.1f}cp"
                 )
-            move, meta = choose_humanized_move(board, depth, movetime_ms, personality)
+            move, meta = choose_humanized_move(board, depth, movetime_ms, personality, pondered)
+            pondered = None
+            # Only the search's own line predicts the reply to this move.
+            ponder_pv = meta.get("pv", []) if move == meta.get("best_move") else []
             if move == 0:
                 print("Bot has no legal moves.")
                 r, rsn = terminal_result(board)
@@ -967,7 +1041,7 @@ def play_game_vs_humanized_bot():
 
 # ---- Entry Point ----
 def main():
-    global BOOK_ENABLED, LEARNER_GUIDE_ENABLED
+    global BOOK_ENABLED, LEARNER_GUIDE_ENABLED, PONDER_ENABLED
 
     print("Initializing Hydra 1.0")
     AllInit()
@@ -977,6 +1051,7 @@ def main():
         print_major_divider("Hydra Terminal Menu")
         print(f"Opening Book: {'ON' if BOOK_ENABLED else 'OFF'}")
         print(f"Learner Guide: {'ON' if LEARNER_GUIDE_ENABLED else 'OFF'}")
+        print(f"Pondering: {'ON' if PONDER_ENABLED else 'OFF'}")
         print_minor_divider("Options")
         print("1) Find the best move in a position (FEN)")
         print("2) Play against the Hydra 1.0 (choose White/Black)")
@@ -984,7 +1059,8 @@ def main():
         print("4) Toggle opening book ON/OFF")
         print("5) Play against a humanized bot (personality sliders)")
         print("6) Toggle learner guide ON/OFF")
-        print("7) Exit")
+        print("7) Toggle pondering ON/OFF")
+        print("8) Exit")
         print_major_divider()
         choice = input("> ").strip()
 
@@ -1003,6 +1079,9 @@ def main():
             LEARNER_GUIDE_ENABLED = not LEARNER_GUIDE_ENABLED
             print(f"Learner guide is now {'ON' if LEARNER_GUIDE_ENABLED else 'OFF'}.")
         elif choice == "7":
+            PONDER_ENABLED = not PONDER_ENABLED
+            print(f"Pondering is now {'ON' if PONDER_ENABLED else 'OFF'}.")
+        elif choice == "8":
             print("Thank You For Using Hydra 1.0.")
             break
         else:
@@ -1,7 +1,10 @@
+import defs
 from defs import *
 from validate import SqOnBoard, PieceValid
+from consts import *
 import hashkeys
-from hashkeys import PieceKeys, CastleKeys
+from hashkeys import PieceKeys, CastleKeys, EpKeys
+from evaluate import PstMg, PstEg, PhaseInc
 
 
 # Move Decoding Macros (Standardized to your defs.py naming)
@@ -11,7 +14,7 @@ def CAPTURED(m):   return ((m >> 14) & 0xF)
 def PROMOTED(m):   return ((m >> 20) & 0xF)
 
 # Data Mapping for Legality Check
-Kings = [Pieces.wK, Pieces.bK]
+Kings = [wK, bK]
 
 # --- Bitboard Helpers ---
 def clear_bit(bitboard, sq64):
@@ -25,10 +28,8 @@ def set_bit(bitboard, sq64):
 #     pos.pos_key ^= PieceKeys[pce][sq]
 
 def HASH_PCE(pce, sq, pos):
-    # Only XOR if it's an actual piece (1-12). 
-    # Never XOR Pieces.EMPTY (0) or NO_SQ (99).
-    if pce != Pieces.EMPTY and pce != 99:
-        pos.pos_key ^= PieceKeys[pce][sq]
+    # Flat [piece * 120 + sq] table; EMPTY's keys are 0 so no guard is needed.
+    pos.pos_key ^= PieceKeys[pce * BOARD_SQ_NUM + sq]
 
 def HASH_CA(pos):
     pos.pos_key ^= CastleKeys[pos.castle_perm]
@@ -40,9 +41,20 @@ def HASH_SIDE(pos):
 #     pos.pos_key ^= PieceKeys[Pieces.EMPTY][pos.en_passant]
 
 def HASH_EP(pos):
-    # Only XOR if there is an active en passant square
-    if pos.en_passant != NO_SQ:
-        pos.pos_key ^= PieceKeys[Pieces.EMPTY][pos.en_passant]
+    # Per-file key; EpKeys[NO_SQ] is 0, so this is a no-op without an ep square
+    pos.pos_key ^= EpKeys[pos.en_passant]
+
+
+
+
+def UNREP_KEY(pos):
+    # Drop one count of the restored position from the repetition multiset
+    rep_keys = pos.rep_keys
+    count = rep_keys[pos.pos_key]
+    if count == 1:
+        del rep_keys[pos.pos_key]
+    else:
+        rep_keys[pos.pos_key] = count - 1
 
 
 
@@ -57,9 +69,18 @@ def ClearPiece(sq, pos):
     # 1. Use the Helper to hash out
     HASH_PCE(pce, sq, pos)
     
-    # 2. Update pieces array and material
-    pos.pieces[sq] = Pieces.EMPTY
+    # 2. Update pieces array, material and incremental eval sums
+    pos.pieces[sq] = EMPTY
     pos.material[col] -= PieceVal[pce]
+    pos.psq_mg -= PstMg[pce][sq]
+    pos.psq_eg -= PstEg[pce][sq]
+    pos.phase -= PhaseInc[pce]
+
+    # Piece and occupancy bitboards
+    bit = SqBB[sq]
+    pos.bitboards[pce] ^= bit
+    pos.occupancy[col] ^= bit
+    pos.occupancy[BOTH] ^= bit
     
     # 3. Update Piece Counters and Bitboards
     if PieceBig[pce]:
@@ -67,10 +88,11 @@ def ClearPiece(sq, pos):
         if PieceMaj[pce]: pos.maj_pce[col] -= 1
         else: pos.min_pce[col] -= 1
     else:
-        # Update pawn bitboards ONLY (No += 1 counters here!)
+        # Update pawn bitboards and pawn key ONLY (No += 1 counters here!)
         sq64 = Sq120to64[sq]
         pos.pawns[col] = clear_bit(pos.pawns[col], sq64)
         pos.pawns[2] = clear_bit(pos.pawns[2], sq64)
+        pos.pawn_key ^= PieceKeys[pce * BOARD_SQ_NUM + sq]
     
     # 4. Piece List Swap and Pop
     t_pceNum = -1
@@ -97,61 +119,74 @@ def AddPiece(sq, pos, pce):
         if PieceMaj[pce]: pos.maj_pce[col] += 1
         else: pos.min_pce[col] += 1
     else:
-        # Update pawn bitboards ONLY
+        # Update pawn bitboards and pawn key ONLY
         sq64 = Sq120to64[sq]
         pos.pawns[col] = set_bit(pos.pawns[col], sq64)
         pos.pawns[2] = set_bit(pos.pawns[2], sq64)
+        pos.pawn_key ^= PieceKeys[pce * BOARD_SQ_NUM + sq]
         
     pos.material[col] += PieceVal[pce]
+    pos.psq_mg += PstMg[pce][sq]
+    pos.psq_eg += PstEg[pce][sq]
+    pos.phase += PhaseInc[pce]
+
+    bit = SqBB[sq]
+    pos.bitboards[pce] ^= bit
+    pos.occupancy[col] ^= bit
+    pos.occupancy[BOTH] ^= bit
     
     pos.p_list[pce][pos.pce_num[pce]] = sq
     pos.pce_num[pce] += 1
 
 def MakeMove(pos, move):
-    assert pos.check_board()
+    if defs.CHECK_BOARD_EVERY:
+        SampledCheckBoard(pos)
 
     from_sq = FROMSQ(move)
     to_sq = TOSQ(move)
     side = pos.side
 
     # 1. Store current state for TakeMove
+    if pos.his_ply >= len(pos.history):
+        pos.grow_history()
     pos.history[pos.his_ply].pos_key = pos.pos_key
     pos.history[pos.his_ply].move = move
     pos.history[pos.his_ply].fifty_move = pos.fifty_move
     pos.history[pos.his_ply].en_passant = pos.en_passant
     pos.history[pos.his_ply].castle_perm = pos.castle_perm
+    rep_keys = pos.rep_keys
+    rep_keys[pos.pos_key] = rep_keys.get(pos.pos_key, 0) + 1
 
     # 2. Handle special captures/moves before the main piece move
     if move & MFLAG_EP:
-        if side == Side.WHITE:
+        if side == WHITE:
             ClearPiece(to_sq - 10, pos)
         else:
             ClearPiece(to_sq + 10, pos)
     elif move & MFLAG_CA:
-        if to_sq == Square.C1:
-            MovePiece(Square.A1, Square.D1, pos)
-        elif to_sq == Square.G1:
-            MovePiece(Square.H1, Square.F1, pos)
-        elif to_sq == Square.C8:
-            MovePiece(Square.A8, Square.D8, pos)
-        elif to_sq == Square.G8:
-            MovePiece(Square.H8, Square.F8, pos)
-
-    # 3. Hash out old en-passant and castling rights
-    if pos.en_passant != Square.NO_SQ:
-        HASH_EP(pos)
-    HASH_CA(pos)
-
-    # 4. Update rights/state and hash in new castling rights
-    pos.castle_perm &= CastlePerm[from_sq]
-    pos.castle_perm &= CastlePerm[to_sq]
-    pos.en_passant = Square.NO_SQ
-    HASH_CA(pos)
+        if to_sq == C1:
+            MovePiece(A1, D1, pos)
+        elif to_sq == G1:
+            MovePiece(H1, F1, pos)
+        elif to_sq == C8:
+            MovePiece(A8, D8, pos)
+        elif to_sq == G8:
+            MovePiece(H8, F8, pos)
+
+    # 3. Hash out old en-passant
+    HASH_EP(pos)
+
+    # 4. Update rights/state. Castle keys are precombined (XOR of one key per
+    #    right), so the old and new rights hash out/in with a single XOR.
+    old_perm = pos.castle_perm
+    pos.castle_perm &= CastlePerm[from_sq] & CastlePerm[to_sq]
+    pos.pos_key ^= CastleKeys[old_perm ^ pos.castle_perm]
+    pos.en_passant = NO_SQ
 
     # 5. Handle captures and move counters
     pos.fifty_move += 1
     captured = CAPTURED(move)
-    if captured != Pieces.EMPTY:
+    if captured != EMPTY:
         ClearPiece(to_sq, pos)
         pos.fifty_move = 0
 
@@ -162,7 +197,7 @@ def MakeMove(pos, move):
     if PiecePawn[pos.pieces[from_sq]]:
         pos.fifty_move = 0
         if move & MFLAG_PS:
-            if side == Side.WHITE:
+            if side == WHITE:
                 pos.en_passant = from_sq + 10
             else:
                 pos.en_passant = from_sq - 10
@@ -172,7 +207,7 @@ def MakeMove(pos, move):
     MovePiece(from_sq, to_sq, pos)
 
     promoted = PROMOTED(move)
-    if promoted != Pieces.EMPTY:
+    if promoted != EMPTY:
         ClearPiece(to_sq, pos)
         AddPiece(to_sq, pos, promoted)
 
@@ -185,7 +220,8 @@ def MakeMove(pos, move):
         TakeMove(pos)
         return False
 
-    assert pos.check_board()
+    if defs.CHECK_BOARD_EVERY:
+        SampledCheckBoard(pos)
     return True
 
 def MovePiece(from_sq, to_sq, pos):
@@ -198,7 +234,7 @@ def MovePiece(from_sq, to_sq, pos):
     
     # 1. Hash the piece out of the old square and into the new square
     HASH_PCE(pce, from_sq, pos)
-    pos.pieces[from_sq] = Pieces.EMPTY
+    pos.pieces[from_sq] = EMPTY
     
     HASH_PCE(pce, to_sq, pos)
     pos.pieces[to_sq] = pce
@@ -224,7 +260,7 @@ def MovePiece(from_sq, to_sq, pos):
             break
             
     # 4. Update King square tracker if a King moved
-    if pce == Pieces.wK or pce == Pieces.bK:
+    if pce == wK or pce == bK:
         pos.king_sq[col] = to_sq
 
 # def MakeMove(pos, move):
@@ -397,7 +433,9 @@ def MovePiece(from_sq, to_sq, pos):
     This updates:
       - pos.pieces[]
       - incremental Zobrist hash via HASH_PCE
-      - pawn bitboards (pos.pawns)
+      - incremental eval sums (pos.psq_mg / pos.psq_eg)
+      - piece and occupancy bitboards (pos.bitboards / pos.occupancy)
+      - pawn bitboards (pos.pawns) and pawn key (pos.pawn_key)
       - piece list (pos.p_list & pos.pce_num)
       - king_sq for kings
     It does NOT handle captures/promotions (ClearPiece/AddPiece handle those).
@@ -408,14 +446,24 @@ def MovePiece(from_sq, to_sq, pos):
     pce = pos.pieces[from_sq]
     col = PieceCol[pce]
 
-    # 1) XOR piece out of the old square and remove it
-    HASH_PCE(pce, from_sq, pos)
-    pos.pieces[from_sq] = Pieces.EMPTY
+    # 1) XOR piece out of the old square and into the new one
+    base = pce * BOARD_SQ_NUM
+    pos.pos_key ^= PieceKeys[base + from_sq] ^ PieceKeys[base + to_sq]
 
-    # 2) XOR piece into the new square and set it
-    HASH_PCE(pce, to_sq, pos)
+    # 2) Move it on the mailbox
+    pos.pieces[from_sq] = EMPTY
     pos.pieces[to_sq] = pce
 
+    # Incremental eval: piece leaves from_sq, lands on to_sq (phase unchanged)
+    pos.psq_mg += PstMg[pce][to_sq] - PstMg[pce][from_sq]
+    pos.psq_eg += PstEg[pce][to_sq] - PstEg[pce][from_sq]
+
+    # Piece and occupancy bitboards: one XOR flips both squares
+    bits = SqBB[from_sq] | SqBB[to_sq]
+    pos.bitboards[pce] ^= bits
+    pos.occupancy[col] ^= bits
+    pos.occupancy[BOTH] ^= bits
+
     # 3) If pawn, update pawn bitboards (and combined)
     if not PieceBig[pce]:
         f_sq64 = Sq120to64[from_sq]
@@ -426,8 +474,11 @@ def MovePiece(from_sq, to_sq, pos):
         pos.pawns[col] = set_bit(pos.pawns[col], t_sq64)
 
         # Update BOTH pawns bitboard
-        pos.pawns[Side.BOTH] = clear_bit(pos.pawns[Side.BOTH], f_sq64)
-        pos.pawns[Side.BOTH] = set_bit(pos.pawns[Side.BOTH], t_sq64)
+        pos.pawns[BOTH] = clear_bit(pos.pawns[BOTH], f_sq64)
+        pos.pawns[BOTH] = set_bit(pos.pawns[BOTH], t_sq64)
+
+        # Pawn-only Zobrist key for the pawn hash
+        pos.pawn_key ^= PieceKeys[base + from_sq] ^ PieceKeys[base + to_sq]
 
     # 4) Update piece list: find the piece entry for from_sq and set to_sq
     #    There must be an entry — sanity assert keeps things safe.
@@ -441,13 +492,12 @@ def MovePiece(from_sq, to_sq, pos):
     pos.p_list[pce][found_index] = to_sq
 
     # 5) If king moved, update king tracker
-    if pce == Pieces.wK:
-        pos.king_sq[Side.WHITE] = to_sq
-    elif pce == Pieces.bK:
-        pos.king_sq[Side.BLACK] = to_sq
+    if IsKing[pce]:
+        pos.king_sq[col] = to_sq
 
 def TakeMove(pos):
-    assert pos.check_board()
+    if defs.CHECK_BOARD_EVERY:
+        SampledCheckBoard(pos)
 
     # 1. Move the counters back
     pos.his_ply -= 1
@@ -466,32 +516,32 @@ def TakeMove(pos):
     
     # Handle En Passant
     if move & MFLAG_EP:
-        if pos.side == Side.WHITE: # Side is still WHITE if BLACK just moved
-            AddPiece(to_sq + 10, pos, Pieces.wP)
+        if pos.side == WHITE: # Side is still WHITE if BLACK just moved
+            AddPiece(to_sq + 10, pos, wP)
         else:
-            AddPiece(to_sq - 10, pos, Pieces.bP)
+            AddPiece(to_sq - 10, pos, bP)
             
     # Handle Castling
     elif move & MFLAG_CA:
-        if to_sq == Square.C1: MovePiece(Square.D1, Square.A1, pos)
-        elif to_sq == Square.G1: MovePiece(Square.F1, Square.H1, pos)
-        elif to_sq == Square.C8: MovePiece(Square.D8, Square.A8, pos)
-        elif to_sq == Square.G8: MovePiece(Square.F8, Square.H8, pos)
+        if to_sq == C1: MovePiece(D1, A1, pos)
+        elif to_sq == G1: MovePiece(F1, H1, pos)
+        elif to_sq == C8: MovePiece(D8, A8, pos)
+        elif to_sq == G8: MovePiece(F8, H8, pos)
 
     # Move the piece that actually moved back to where it started
     MovePiece(to_sq, from_sq, pos)
     
     # Put captured pieces back
     captured = CAPTURED(move)
-    if captured != Pieces.EMPTY:
+    if captured != EMPTY:
         AddPiece(to_sq, pos, captured)
         
     # Reverse Promotions
-    if PROMOTED(move) != Pieces.EMPTY:
+    if PROMOTED(move) != EMPTY:
         ClearPiece(from_sq, pos)
         # Put the pawn back (side depends on who just moved)
         # If it's currently Black's turn, White is the one who promoted
-        pawn = Pieces.wP if pos.side == Side.BLACK else Pieces.bP
+        pawn = wP if pos.side == BLACK else bP
         AddPiece(from_sq, pos, pawn)
 
     # ---------------------------------------------------------
@@ -505,8 +555,10 @@ def TakeMove(pos):
     pos.fifty_move = pos.history[pos.his_ply].fifty_move
     pos.en_passant = pos.history[pos.his_ply].en_passant
     pos.pos_key = pos.history[pos.his_ply].pos_key
+    UNREP_KEY(pos)
 
-    assert pos.check_board()
+    if defs.CHECK_BOARD_EVERY:
+        SampledCheckBoard(pos)
 
 # def TakeMove(pos):
 #     """Undoes the last move made on the board using the history array."""
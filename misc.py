@@ -1,5 +1,6 @@
 import time
 import sys
+import threading
 
 try:
     import select
@@ -20,6 +21,20 @@ def GetTimeMs():
     return time.monotonic_ns() // 1_000_000
 
 
+# One lock for every line of engine output: the UCI search thread prints
+# info/bestmove while the main thread answers isready.
+_output_lock = threading.Lock()
+
+
+def SendLine(line):
+    """
+    Write one whole line to stdout and flush it, safe from any thread.
+    """
+    with _output_lock:
+        sys.stdout.write(line + "\n")
+        sys.stdout.flush()
+
+
 def InputWaiting():
     """
     Non-blocking check for pending console/stdin input.
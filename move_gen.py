@@ -1,14 +1,17 @@
 # move_gen.py
+from array import array
 from defs import *
+from consts import *
 
 MAX_POS_MOVES = 256
+NOMOVE = 0
 VictimScore = [0, 100, 200, 300, 400, 500, 600, 100, 200, 300, 400, 500, 600]
 MvvLvaScores = [[0 for _ in range(13)] for _ in range(13)]
 
 
 def InitMvvLva():
-    for attacker in range(Pieces.wP, Pieces.bK + 1):
-        for victim in range(Pieces.wP, Pieces.bK + 1):
+    for attacker in range(wP, bK + 1):
+        for victim in range(wP, bK + 1):
             MvvLvaScores[victim][attacker] = (
                 VictimScore[victim] + 6 - (VictimScore[attacker] // 100)
             )
@@ -16,13 +19,13 @@ def InitMvvLva():
 
 # The '0' at the end of each sequence acts as a terminator for the while loop
 LoopSlidePiece = [ 
-    Pieces.wB, Pieces.wR, Pieces.wQ, 0, 
-    Pieces.bB, Pieces.bR, Pieces.bQ, 0 
+    wB, wR, wQ, 0, 
+    bB, bR, bQ, 0 
 ]
 
 LoopNonSlidePiece = [ 
-    Pieces.wN, Pieces.wK, 0, 
-    Pieces.bN, Pieces.bK, 0 
+    wN, wK, 0, 
+    bN, bK, 0 
 ]
 
 # These tell the engine where to start looking in the arrays above 
@@ -32,15 +35,30 @@ LoopNonSlideIndex = [ 0, 3 ]
 
 
 class MoveList:
+    __slots__ = ("moves", "scores", "count")
+
     def __init__(self):
-        self.moves = [Move() for _ in range(MAX_POS_MOVES)]
+        # Parallel int buffers instead of MAX_POS_MOVES Move objects:
+        # moves[i] is the packed move, scores[i] its ordering score.
+        self.moves = array("i", bytes(4 * MAX_POS_MOVES))
+        self.scores = array("i", bytes(4 * MAX_POS_MOVES))
         self.count = 0
 
+
+# Preallocated per-ply move lists, reused for the whole search.
+# A node at ply N generates into MoveStack[N]; children use N + 1,
+# so nothing on the hot path allocates a list.
+MoveStack = [MoveList() for _ in range(MAXDEPTH + 1)]
+
+# Scratch list for one-shot legality lookups (MoveExists, ParseMove, book).
+# These never recurse into another generator call while iterating.
+ScratchMoveList = MoveList()
+
 def AddQuietMove(pos, move, list):
     assert SqOnBoard(FROMSQ(move))
     assert SqOnBoard(TOSQ(move))
-    list.moves[list.count].move = move
-    list.moves[list.count].score = 0
+    list.moves[list.count] = move
+    list.scores[list.count] = 0
     list.count += 1
 
 def AddCaptureMove(pos, move, list):
@@ -50,73 +68,73 @@ def AddCaptureMove(pos, move, list):
 
     attacker = pos.pieces[FROMSQ(move)]
     victim = CAPTURED(move)
-    list.moves[list.count].move = move
-    list.moves[list.count].score = MvvLvaScores[victim][attacker]
+    list.moves[list.count] = move
+    list.scores[list.count] = MvvLvaScores[victim][attacker]
     list.count += 1
 
 def AddEnPassantMove(pos, move, list):
     assert SqOnBoard(FROMSQ(move))
     assert SqOnBoard(TOSQ(move))
-    assert pos.en_passant != Square.NO_SQ
+    assert pos.en_passant != NO_SQ
     assert TOSQ(move) == pos.en_passant
 
-    list.moves[list.count].move = move
+    list.moves[list.count] = move
     # En passant is pawn takes pawn.
-    list.moves[list.count].score = 105
+    list.scores[list.count] = 105
     list.count += 1
 
 def AddWhitePawnCaptureMove(board, from_sq, to_sq, cap, move_list):
-    if RanksBoard[from_sq] == Ranks.RANK_7:
-        AddCaptureMove(board, MOVE(from_sq, to_sq, cap, Pieces.wQ, 0), move_list)
-        AddCaptureMove(board, MOVE(from_sq, to_sq, cap, Pieces.wR, 0), move_list)
-        AddCaptureMove(board, MOVE(from_sq, to_sq, cap, Pieces.wB, 0), move_list)
-        AddCaptureMove(board, MOVE(from_sq, to_sq, cap, Pieces.wN, 0), move_list)
+    if RanksBoard[from_sq] == RANK_7:
+        AddCaptureMove(board, MOVE(from_sq, to_sq, cap, wQ, 0), move_list)
+        AddCaptureMove(board, MOVE(from_sq, to_sq, cap, wR, 0), move_list)
+        AddCaptureMove(board, MOVE(from_sq, to_sq, cap, wB, 0), move_list)
+        AddCaptureMove(board, MOVE(from_sq, to_sq, cap, wN, 0), move_list)
     else:
-        AddCaptureMove(board, MOVE(from_sq, to_sq, cap, Pieces.EMPTY, 0), move_list)
+        AddCaptureMove(board, MOVE(from_sq, to_sq, cap, EMPTY, 0), move_list)
 
 # In move_gen.py
 def AddWhitePawnMove(board, from_sq, to_sq, move_list):
     # Check if the pawn is on the 7th rank (ready to promote)
-    if RanksBoard[from_sq] == Ranks.RANK_7:
-        AddQuietMove(board, MOVE(from_sq, to_sq, Pieces.EMPTY, Pieces.wQ, 0), move_list)
-        AddQuietMove(board, MOVE(from_sq, to_sq, Pieces.EMPTY, Pieces.wR, 0), move_list)
-        AddQuietMove(board, MOVE(from_sq, to_sq, Pieces.EMPTY, Pieces.wB, 0), move_list)
-        AddQuietMove(board, MOVE(from_sq, to_sq, Pieces.EMPTY, Pieces.wN, 0), move_list)
+    if RanksBoard[from_sq] == RANK_7:
+        AddQuietMove(board, MOVE(from_sq, to_sq, EMPTY, wQ, 0), move_list)
+        AddQuietMove(board, MOVE(from_sq, to_sq, EMPTY, wR, 0), move_list)
+        AddQuietMove(board, MOVE(from_sq, to_sq, EMPTY, wB, 0), move_list)
+        AddQuietMove(board, MOVE(from_sq, to_sq, EMPTY, wN, 0), move_list)
     else:
         # Standard move for pawns on any other rank
-        AddQuietMove(board, MOVE(from_sq, to_sq, Pieces.EMPTY, Pieces.EMPTY, 0), move_list)
+        AddQuietMove(board, MOVE(from_sq, to_sq, EMPTY, EMPTY, 0), move_list)
 
 def AddBlackPawnCaptureMove(board, from_sq, to_sq, cap, move_list):
     # Black promotes when moving FROM Rank 2 TO Rank 1
-    if RanksBoard[from_sq] == Ranks.RANK_2:
-        AddCaptureMove(board, MOVE(from_sq, to_sq, cap, Pieces.bQ, 0), move_list)
-        AddCaptureMove(board, MOVE(from_sq, to_sq, cap, Pieces.bR, 0), move_list)
-        AddCaptureMove(board, MOVE(from_sq, to_sq, cap, Pieces.bB, 0), move_list)
-        AddCaptureMove(board, MOVE(from_sq, to_sq, cap, Pieces.bN, 0), move_list)
+    if RanksBoard[from_sq] == RANK_2:
+        AddCaptureMove(board, MOVE(from_sq, to_sq, cap, bQ, 0), move_list)
+        AddCaptureMove(board, MOVE(from_sq, to_sq, cap, bR, 0), move_list)
+        AddCaptureMove(board, MOVE(from_sq, to_sq, cap, bB, 0), move_list)
+        AddCaptureMove(board, MOVE(from_sq, to_sq, cap, bN, 0), move_list)
     else:
-        AddCaptureMove(board, MOVE(from_sq, to_sq, cap, Pieces.EMPTY, 0), move_list)
+        AddCaptureMove(board, MOVE(from_sq, to_sq, cap, EMPTY, 0), move_list)
 
 def AddBlackPawnMove(board, from_sq, to_sq, move_list):
-    if RanksBoard[from_sq] == Ranks.RANK_2:
-        AddQuietMove(board, MOVE(from_sq, to_sq, Pieces.EMPTY, Pieces.bQ, 0), move_list)
-        AddQuietMove(board, MOVE(from_sq, to_sq, Pieces.EMPTY, Pieces.bR, 0), move_list)
-        AddQuietMove(board, MOVE(from_sq, to_sq, Pieces.EMPTY, Pieces.bB, 0), move_list)
-        AddQuietMove(board, MOVE(from_sq, to_sq, Pieces.EMPTY, Pieces.bN, 0), move_list)
+    if RanksBoard[from_sq] == RANK_2:
+        AddQuietMove(board, MOVE(from_sq, to_sq, EMPTY, bQ, 0), move_list)
+        AddQuietMove(board, MOVE(from_sq, to_sq, EMPTY, bR, 0), move_list)
+        AddQuietMove(board, MOVE(from_sq, to_sq, EMPTY, bB, 0), move_list)
+        AddQuietMove(board, MOVE(from_sq, to_sq, EMPTY, bN, 0), move_list)
     else:
-        AddQuietMove(board, MOVE(from_sq, to_sq, Pieces.EMPTY, Pieces.EMPTY, 0), move_list)
+        AddQuietMove(board, MOVE(from_sq, to_sq, EMPTY, EMPTY, 0), move_list)
 
 def generate_white_pawn_moves(pos, move_list):
     # Loop through all white pawns using the piece list (p_list)
-    for pce_num in range(pos.pce_num[Pieces.wP]):
-        sq = pos.p_list[Pieces.wP][pce_num]
+    for pce_num in range(pos.pce_num[wP]):
+        sq = pos.p_list[wP][pce_num]
         assert SqOnBoard(sq)
         
         # 1. Forward Moves
-        if pos.pieces[sq + 10] == Pieces.EMPTY:
+        if pos.pieces[sq + 10] == EMPTY:
             AddWhitePawnMove(pos, sq, sq + 10, move_list)
             # Double Push from Rank 2
-            if RanksBoard[sq] == Ranks.RANK_2 and pos.pieces[sq + 20] == Pieces.EMPTY:
-                AddQuietMove(pos, MOVE(sq, sq + 20, Pieces.EMPTY, Pieces.EMPTY, PAWN_START_FLAG), move_list)
+            if RanksBoard[sq] == RANK_2 and pos.pieces[sq + 20] == EMPTY:
+                AddQuietMove(pos, MOVE(sq, sq + 20, EMPTY, EMPTY, PAWN_START_FLAG), move_list)
         
         # 2. Diagonal Captures
         for off in [9, 11]:
@@ -126,24 +144,24 @@ def generate_white_pawn_moves(pos, move_list):
             
             pce = pos.pieces[target_sq]
             # Check if square contains a black piece
-            if pce != Pieces.EMPTY and PieceCol[pce] == Side.BLACK:
+            if pce != EMPTY and PieceCol[pce] == BLACK:
                 AddWhitePawnCaptureMove(pos, sq, target_sq, pce, move_list)
             
             # 3. En Passant Check
-            if pos.en_passant != Square.NO_SQ:
+            if pos.en_passant != NO_SQ:
                 if target_sq == pos.en_passant:
-                    AddEnPassantMove(pos, MOVE(sq, target_sq, Pieces.EMPTY, Pieces.EMPTY, EP_FLAG), move_list)
+                    AddEnPassantMove(pos, MOVE(sq, target_sq, EMPTY, EMPTY, EP_FLAG), move_list)
 
 def generate_black_pawn_moves(pos, move_list):
-    for pce_num in range(pos.pce_num[Pieces.bP]):
-        sq = pos.p_list[Pieces.bP][pce_num]
+    for pce_num in range(pos.pce_num[bP]):
+        sq = pos.p_list[bP][pce_num]
         
         # 1. Forward Move (-10)
-        if pos.pieces[sq - 10] == Pieces.EMPTY:
+        if pos.pieces[sq - 10] == EMPTY:
             AddBlackPawnMove(pos, sq, sq - 10, move_list)
             # Double Push from Rank 7 (Black starts on Rank 7)
-            if RanksBoard[sq] == Ranks.RANK_7 and pos.pieces[sq - 20] == Pieces.EMPTY:
-                AddQuietMove(pos, MOVE(sq, sq - 20, Pieces.EMPTY, Pieces.EMPTY, PAWN_START_FLAG), move_list)
+            if RanksBoard[sq] == RANK_7 and pos.pieces[sq - 20] == EMPTY:
+                AddQuietMove(pos, MOVE(sq, sq - 20, EMPTY, EMPTY, PAWN_START_FLAG), move_list)
         
         # 2. Diagonal Captures (-9, -11)
         for off in [-9, -11]:
@@ -152,18 +170,18 @@ def generate_black_pawn_moves(pos, move_list):
                 continue
             
             pce = pos.pieces[target_sq]
-            if pce != Pieces.EMPTY and PieceCol[pce] == Side.WHITE:
+            if pce != EMPTY and PieceCol[pce] == WHITE:
                 AddBlackPawnCaptureMove(pos, sq, target_sq, pce, move_list)
             
             # 3. En Passant
-            if pos.en_passant != Square.NO_SQ:
+            if pos.en_passant != NO_SQ:
                 if target_sq == pos.en_passant:
-                    AddEnPassantMove(pos, MOVE(sq, target_sq, Pieces.EMPTY, Pieces.EMPTY, EP_FLAG), move_list)
+                    AddEnPassantMove(pos, MOVE(sq, target_sq, EMPTY, EMPTY, EP_FLAG), move_list)
 
 
 def generate_white_pawn_captures(pos, move_list):
-    for pce_num in range(pos.pce_num[Pieces.wP]):
-        sq = pos.p_list[Pieces.wP][pce_num]
+    for pce_num in range(pos.pce_num[wP]):
+        sq = pos.p_list[wP][pce_num]
         assert SqOnBoard(sq)
 
         for off in [9, 11]:
@@ -172,16 +190,16 @@ def generate_white_pawn_captures(pos, move_list):
                 continue
 
             pce = pos.pieces[target_sq]
-            if pce != Pieces.EMPTY and PieceCol[pce] == Side.BLACK:
+            if pce != EMPTY and PieceCol[pce] == BLACK:
                 AddWhitePawnCaptureMove(pos, sq, target_sq, pce, move_list)
 
-            if pos.en_passant != Square.NO_SQ and target_sq == pos.en_passant:
-                AddEnPassantMove(pos, MOVE(sq, target_sq, Pieces.EMPTY, Pieces.EMPTY, EP_FLAG), move_list)
+            if pos.en_passant != NO_SQ and target_sq == pos.en_passant:
+                AddEnPassantMove(pos, MOVE(sq, target_sq, EMPTY, EMPTY, EP_FLAG), move_list)
 
 
 def generate_black_pawn_captures(pos, move_list):
-    for pce_num in range(pos.pce_num[Pieces.bP]):
-        sq = pos.p_list[Pieces.bP][pce_num]
+    for pce_num in range(pos.pce_num[bP]):
+        sq = pos.p_list[bP][pce_num]
         assert SqOnBoard(sq)
 
         for off in [-9, -11]:
@@ -190,47 +208,47 @@ def generate_black_pawn_captures(pos, move_list):
                 continue
 
             pce = pos.pieces[target_sq]
-            if pce != Pieces.EMPTY and PieceCol[pce] == Side.WHITE:
+            if pce != EMPTY and PieceCol[pce] == WHITE:
                 AddBlackPawnCaptureMove(pos, sq, target_sq, pce, move_list)
 
-            if pos.en_passant != Square.NO_SQ and target_sq == pos.en_passant:
-                AddEnPassantMove(pos, MOVE(sq, target_sq, Pieces.EMPTY, Pieces.EMPTY, EP_FLAG), move_list)
+            if pos.en_passant != NO_SQ and target_sq == pos.en_passant:
+                AddEnPassantMove(pos, MOVE(sq, target_sq, EMPTY, EMPTY, EP_FLAG), move_list)
 
 
 def GenerateAllMoves(pos, move_list):
     move_list.count = 0
     side = pos.side
 
-    if side == Side.WHITE:
+    if side == WHITE:
         generate_white_pawn_moves(pos, move_list)
         
         # --- White Castling Logic ---
         # Kingside: Check if squares f1, g1 are empty and e1, f1 are not attacked
-        if pos.castle_perm & Castling.WKSC:
-            if pos.pieces[Square.F1] == Pieces.EMPTY and pos.pieces[Square.G1] == Pieces.EMPTY:
-                if not pos.is_sq_attacked(Square.E1, Side.BLACK) and not pos.is_sq_attacked(Square.F1, Side.BLACK):
-                    AddQuietMove(pos, MOVE(Square.E1, Square.G1, Pieces.EMPTY, Pieces.EMPTY, MFLAG_CA), move_list)
+        if pos.castle_perm & WKSC:
+            if pos.pieces[F1] == EMPTY and pos.pieces[G1] == EMPTY:
+                if not pos.is_sq_attacked(E1, BLACK) and not pos.is_sq_attacked(F1, BLACK):
+                    AddQuietMove(pos, MOVE(E1, G1, EMPTY, EMPTY, MFLAG_CA), move_list)
 
         # Queenside: Check if d1, c1, b1 are empty and e1, d1 are not attacked
-        if pos.castle_perm & Castling.WQSC:
-            if pos.pieces[Square.D1] == Pieces.EMPTY and pos.pieces[Square.C1] == Pieces.EMPTY and pos.pieces[Square.B1] == Pieces.EMPTY:
-                if not pos.is_sq_attacked(Square.E1, Side.BLACK) and not pos.is_sq_attacked(Square.D1, Side.BLACK):
-                    AddQuietMove(pos, MOVE(Square.E1, Square.C1, Pieces.EMPTY, Pieces.EMPTY, MFLAG_CA), move_list)
+        if pos.castle_perm & WQSC:
+            if pos.pieces[D1] == EMPTY and pos.pieces[C1] == EMPTY and pos.pieces[B1] == EMPTY:
+                if not pos.is_sq_attacked(E1, BLACK) and not pos.is_sq_attacked(D1, BLACK):
+                    AddQuietMove(pos, MOVE(E1, C1, EMPTY, EMPTY, MFLAG_CA), move_list)
     else:
         generate_black_pawn_moves(pos, move_list)
         
         # --- Black Castling Logic ---
         # Kingside: Check if f8, g8 are empty and e8, f8 are not attacked
-        if pos.castle_perm & Castling.BKSC:
-            if pos.pieces[Square.F8] == Pieces.EMPTY and pos.pieces[Square.G8] == Pieces.EMPTY:
-                if not pos.is_sq_attacked(Square.E8, Side.WHITE) and not pos.is_sq_attacked(Square.F8, Side.WHITE):
-                    AddQuietMove(pos, MOVE(Square.E8, Square.G8, Pieces.EMPTY, Pieces.EMPTY, MFLAG_CA), move_list)
+        if pos.castle_perm & BKSC:
+            if pos.pieces[F8] == EMPTY and pos.pieces[G8] == EMPTY:
+                if not pos.is_sq_attacked(E8, WHITE) and not pos.is_sq_attacked(F8, WHITE):
+                    AddQuietMove(pos, MOVE(E8, G8, EMPTY, EMPTY, MFLAG_CA), move_list)
 
         # Queenside: Check if d8, c8, b8 are empty and e8, d8 are not attacked
-        if pos.castle_perm & Castling.BQSC:
-            if pos.pieces[Square.D8] == Pieces.EMPTY and pos.pieces[Square.C8] == Pieces.EMPTY and pos.pieces[Square.B8] == Pieces.EMPTY:
-                if not pos.is_sq_attacked(Square.E8, Side.WHITE) and not pos.is_sq_attacked(Square.D8, Side.WHITE):
-                    AddQuietMove(pos, MOVE(Square.E8, Square.C8, Pieces.EMPTY, Pieces.EMPTY, MFLAG_CA), move_list)
+        if pos.castle_perm & BQSC:
+            if pos.pieces[D8] == EMPTY and pos.pieces[C8] == EMPTY and pos.pieces[B8] == EMPTY:
+                if not pos.is_sq_attacked(E8, WHITE) and not pos.is_sq_attacked(D8, WHITE):
+                    AddQuietMove(pos, MOVE(E8, C8, EMPTY, EMPTY, MFLAG_CA), move_list)
     # 2. Loop through Sliding Pieces
     pce_idx = LoopSlideIndex[side]
     pce = LoopSlidePiece[pce_idx]
@@ -247,14 +265,14 @@ def GenerateAllMoves(pos, move_list):
                 while SqOnBoard(target_sq):
                     target_pce = pos.pieces[target_sq]
                     
-                    if target_pce != Pieces.EMPTY:
+                    if target_pce != EMPTY:
                         # Capture enemy piece then stop sliding
                         if PieceCol[target_pce] == (side ^ 1):
-                            AddCaptureMove(pos, MOVE(sq, target_sq, target_pce, Pieces.EMPTY, 0), move_list)
+                            AddCaptureMove(pos, MOVE(sq, target_sq, target_pce, EMPTY, 0), move_list)
                         break 
                     
                     # Empty square: add move and continue sliding
-                    AddQuietMove(pos, MOVE(sq, target_sq, Pieces.EMPTY, Pieces.EMPTY, 0), move_list)
+                    AddQuietMove(pos, MOVE(sq, target_sq, EMPTY, EMPTY, 0), move_list)
                     target_sq += dir
             
         pce_idx += 1
@@ -273,11 +291,11 @@ def GenerateAllMoves(pos, move_list):
                 if not SqOnBoard(target_sq): continue
                 
                 target_pce = pos.pieces[target_sq]
-                if target_pce != Pieces.EMPTY:
+                if target_pce != EMPTY:
                     if PieceCol[target_pce] == (side ^ 1):
-                        AddCaptureMove(pos, MOVE(sq, target_sq, target_pce, Pieces.EMPTY, 0), move_list)
+                        AddCaptureMove(pos, MOVE(sq, target_sq, target_pce, EMPTY, 0), move_list)
                 else:
-                    AddQuietMove(pos, MOVE(sq, target_sq, Pieces.EMPTY, Pieces.EMPTY, 0), move_list)
+                    AddQuietMove(pos, MOVE(sq, target_sq, EMPTY, EMPTY, 0), move_list)
         pce_idx += 1
         pce = LoopNonSlidePiece[pce_idx]
 
@@ -286,7 +304,7 @@ def GenerateAllCaps(pos, move_list):
     move_list.count = 0
     side = pos.side
 
-    if side == Side.WHITE:
+    if side == WHITE:
         generate_white_pawn_captures(pos, move_list)
     else:
         generate_black_pawn_captures(pos, move_list)
@@ -303,11 +321,11 @@ def GenerateAllCaps(pos, move_list):
 
                 while SqOnBoard(target_sq):
                     target_pce = pos.pieces[target_sq]
-                    if target_pce != Pieces.EMPTY:
+                    if target_pce != EMPTY:
                         if PieceCol[target_pce] == (side ^ 1):
                             AddCaptureMove(
                                 pos,
-                                MOVE(sq, target_sq, target_pce, Pieces.EMPTY, 0),
+                                MOVE(sq, target_sq, target_pce, EMPTY, 0),
                                 move_list,
                             )
                         break
@@ -328,30 +346,331 @@ def GenerateAllCaps(pos, move_list):
                     continue
 
                 target_pce = pos.pieces[target_sq]
-                if target_pce != Pieces.EMPTY and PieceCol[target_pce] == (side ^ 1):
+                if target_pce != EMPTY and PieceCol[target_pce] == (side ^ 1):
                     AddCaptureMove(
                         pos,
-                        MOVE(sq, target_sq, target_pce, Pieces.EMPTY, 0),
+                        MOVE(sq, target_sq, target_pce, EMPTY, 0),
                         move_list,
                     )
         pce_idx += 1
         pce = LoopNonSlidePiece[pce_idx]
 
 
-def MoveExists(pos, move):
+# --- Legal move generation ---
+# Checkers and pins are worked out once per node from the bitboards, so a
+# candidate is accepted or dropped with a few mask tests instead of a
+# make/unmake plus attack scan. Moves come out in the same order as
+# GenerateAllMoves, so move ordering ties break exactly as before.
+
+def _pinned_pieces(pos, king64, side, occ):
+    bbs = pos.bitboards
+    pawn, knight, bishop, rook, queen, king = AttackerPieces[side ^ 1]
+    snipers = (
+        (RookRays[king64] & (bbs[rook] | bbs[queen]))
+        | (BishopRays[king64] & (bbs[bishop] | bbs[queen]))
+    )
+    own = pos.occupancy[side]
+    pinned = 0
+    while snipers:
+        lsb = snipers & -snipers
+        snipers ^= lsb
+        blockers = BetweenBB[king64][lsb.bit_length() - 1] & occ
+        # exactly one piece in between, and it is ours
+        if blockers and not (blockers & (blockers - 1)) and (blockers & own):
+            pinned |= blockers
+    return pinned
+
+
+def _ep_is_legal(pos, from_sq, to_sq, king_sq, occ):
+    # Both pawns leave their squares at once, so test the king on the board after the capture
+    cap_sq = to_sq - 10 if pos.side == WHITE else to_sq + 10
+    occ_after = (occ ^ SqBB[from_sq] ^ SqBB[cap_sq]) | SqBB[to_sq]
+    return not pos.attackers_to(king_sq, pos.side ^ 1, occ_after)
+
+
+def _generate_evasions(pos, move_list, king_sq, checkers, pinned):
+    move_list.count = 0
+    side = pos.side
+    enemy = side ^ 1
+    pieces = pos.pieces
+    occ = pos.occupancy[BOTH]
+
+    # Single check: other pieces may capture the checker or step in between.
+    # Pinned pieces can never do either legally. Double check: king moves only.
+    if not (checkers & (checkers - 1)):
+        target = checkers | BetweenBB[Sq120to64[king_sq]][checkers.bit_length() - 1]
+
+        if side == WHITE:
+            pawn, fwd, start_rank, cap_offs = wP, 10, RANK_2, (9, 11)
+            add_pawn_move, add_pawn_cap = AddWhitePawnMove, AddWhitePawnCaptureMove
+        else:
+            pawn, fwd, start_rank, cap_offs = bP, -10, RANK_7, (-9, -11)
+            add_pawn_move, add_pawn_cap = AddBlackPawnMove, AddBlackPawnCaptureMove
+
+        for pce_num in range(pos.pce_num[pawn]):
+            sq = pos.p_list[pawn][pce_num]
+            if pinned & SqBB[sq]:
+                continue
+
+            t_sq = sq + fwd
+            if pieces[t_sq] == EMPTY:
+                if SqBB[t_sq] & target:
+                    add_pawn_move(pos, sq, t_sq, move_list)
+                if (
+                    RanksBoard[sq] == start_rank
+                    and pieces[t_sq + fwd] == EMPTY
+                    and SqBB[t_sq + fwd] & target
+                ):
+                    AddQuietMove(pos, MOVE(sq, t_sq + fwd, EMPTY, EMPTY, PAWN_START_FLAG), move_list)
+
+            for off in cap_offs:
+                t_sq = sq + off
+                if not SqBB[t_sq]:
+                    continue
+                if SqBB[t_sq] & checkers:
+                    add_pawn_cap(pos, sq, t_sq, pieces[t_sq], move_list)
+                if t_sq == pos.en_passant and _ep_is_legal(pos, sq, t_sq, king_sq, occ):
+                    AddEnPassantMove(pos, MOVE(sq, t_sq, EMPTY, EMPTY, EP_FLAG), move_list)
+
+        pce_idx = LoopSlideIndex[side]
+        pce = LoopSlidePiece[pce_idx]
+        while pce != 0:
+            for i in range(pos.pce_num[pce]):
+                sq = pos.p_list[pce][i]
+                if pinned & SqBB[sq]:
+                    continue
+                if not (piece_attacks(pce, Sq120to64[sq], occ) & target):
+                    continue
+                for index in range(NumDir[pce]):
+                    direction = PceDir[pce][index]
+                    t_sq = sq + direction
+                    while SqBB[t_sq]:
+                        t_pce = pieces[t_sq]
+                        if SqBB[t_sq] & target:
+                            if t_pce != EMPTY:
+                                AddCaptureMove(pos, MOVE(sq, t_sq, t_pce, EMPTY, 0), move_list)
+                            else:
+                                AddQuietMove(pos, MOVE(sq, t_sq, EMPTY, EMPTY, 0), move_list)
+                        if t_pce != EMPTY:
+                            break
+                        t_sq += direction
+            pce_idx += 1
+            pce = LoopSlidePiece[pce_idx]
+
+        knight = wN if side == WHITE else bN
+        for i in range(pos.pce_num[knight]):
+            sq = pos.p_list[knight][i]
+            if pinned & SqBB[sq] or not (KnightAttacks[Sq120to64[sq]] & target):
+                continue
+            for direction in KnDir:
+                t_sq = sq + direction
+                if SqBB[t_sq] & target:
+                    t_pce = pieces[t_sq]
+                    if t_pce != EMPTY:
+                        AddCaptureMove(pos, MOVE(sq, t_sq, t_pce, EMPTY, 0), move_list)
+                    else:
+                        AddQuietMove(pos, MOVE(sq, t_sq, EMPTY, EMPTY, 0), move_list)
+
+    # King steps: the king itself is lifted so it cannot hide behind its own square.
+    no_king_occ = occ ^ SqBB[king_sq]
+    for direction in KiDir:
+        t_sq = king_sq + direction
+        if not SqBB[t_sq]:
+            continue
+        t_pce = pieces[t_sq]
+        if t_pce != EMPTY and PieceCol[t_pce] != enemy:
+            continue
+        if pos.attackers_to(t_sq, enemy, no_king_occ):
+            continue
+        if t_pce != EMPTY:
+            AddCaptureMove(pos, MOVE(king_sq, t_sq, t_pce, EMPTY, 0), move_list)
+        else:
+            AddQuietMove(pos, MOVE(king_sq, t_sq, EMPTY, EMPTY, 0), move_list)
+
+
+def _keep_legal(pos, move_list, king_sq, pinned, quiets_only=False):
+    # Compact a pseudo-legal list in place, for a side that is not in check.
+    # Only king steps, en passant and pinned pieces can be illegal here.
+    enemy = pos.side ^ 1
+    king64 = Sq120to64[king_sq]
+    no_king_occ = pos.occupancy[BOTH] ^ SqBB[king_sq]
+    moves = move_list.moves
+    scores = move_list.scores
+    kept = 0
+    for i in range(move_list.count):
+        move = moves[i]
+        if quiets_only and move & MFLAG_CAP:
+            continue
+        from_sq = move & 0x7F
+
+        if from_sq == king_sq:
+            # castling already checked the start and crossing squares
+            if pos.attackers_to((move >> 7) & 0x7F, enemy, no_king_occ):
+                continue
+        elif move & MFLAG_EP:
+            if not _ep_is_legal(pos, from_sq, (move >> 7) & 0x7F, king_sq, pos.occupancy[BOTH]):
+                continue
+        elif pinned & SqBB[from_sq]:
+            # a pinned piece may only slide along the pin line
+            if not (SqBB[(move >> 7) & 0x7F] & LineBB[king64][Sq120to64[from_sq]]):
+                continue
+
+        moves[kept] = move
+        scores[kept] = scores[i]
+        kept += 1
+    move_list.count = kept
+
+
+def GenerateLegalMoves(pos, move_list):
     """
-    Returns True if `move` is legal in the current position.
+    Fill move_list with strictly legal moves only.
+    Out of check: generate pseudo-legal moves and drop the few that fail a
+    pin / king-step / en passant test. In check: generate evasions directly.
     """
-    from make_mov import MakeMove, TakeMove
+    side = pos.side
+    king_sq = pos.king_sq[side]
+    occ = pos.occupancy[BOTH]
+
+    checkers = pos.attackers_to(king_sq, side ^ 1, occ)
+    pinned = _pinned_pieces(pos, Sq120to64[king_sq], side, occ)
+
+    if checkers:
+        _generate_evasions(pos, move_list, king_sq, checkers, pinned)
+        return
 
-    move_list = MoveList()
     GenerateAllMoves(pos, move_list)
+    _keep_legal(pos, move_list, king_sq, pinned)
+
+
+def GenerateLegalCaps(pos, move_list):
+    # Legal captures (incl. en passant and capture-promotions) for a side not in check.
+    king_sq = pos.king_sq[pos.side]
+    pinned = _pinned_pieces(pos, Sq120to64[king_sq], pos.side, pos.occupancy[BOTH])
+    GenerateAllCaps(pos, move_list)
+    _keep_legal(pos, move_list, king_sq, pinned)
+
+
+def GenerateLegalQuiets(pos, move_list):
+    # Legal non-captures (incl. castling and quiet promotions) for a side not in check.
+    king_sq = pos.king_sq[pos.side]
+    pinned = _pinned_pieces(pos, Sq120to64[king_sq], pos.side, pos.occupancy[BOTH])
+    GenerateAllMoves(pos, move_list)
+    _keep_legal(pos, move_list, king_sq, pinned, quiets_only=True)
+
+
+# Castling moves and what GenerateAllMoves requires before adding them:
+# right, squares that must be empty, squares the king starts on / crosses.
+# The landing square is covered by the ordinary king-safety test.
+CastleMoveRules = {
+    MOVE(E1, G1, EMPTY, EMPTY, MFLAG_CA):
+        (WKSC, (F1, G1), (E1, F1)),
+    MOVE(E1, C1, EMPTY, EMPTY, MFLAG_CA):
+        (WQSC, (D1, C1, B1), (E1, D1)),
+    MOVE(E8, G8, EMPTY, EMPTY, MFLAG_CA):
+        (BKSC, (F8, G8), (E8, F8)),
+    MOVE(E8, C8, EMPTY, EMPTY, MFLAG_CA):
+        (BQSC, (D8, C8, B8), (E8, D8)),
+}
+
+
+def MoveIsLegal(pos, move):
+    """
+    Returns True if `move` (e.g. from the hash table or a killer slot) can be
+    played in the current position, without generating the move list.
+    """
+    if move == NOMOVE:
+        return False
+
+    from_sq = move & 0x7F
+    to_sq = (move >> 7) & 0x7F
+    if not SqBB[from_sq] or not SqBB[to_sq]:
+        return False
+
+    side = pos.side
+    enemy = side ^ 1
+    pieces = pos.pieces
+    pce = pieces[from_sq]
+    if pce == EMPTY or PieceCol[pce] != side:
+        return False
+
+    target = pieces[to_sq]
+    captured = CAPTURED(move)
+    promoted = PROMOTED(move)
+    occ = pos.occupancy[BOTH]
+    from64 = Sq120to64[from_sq]
+
+    if move & MFLAG_CA:
+        rule = CastleMoveRules.get(move)
+        if rule is None or pce != AttackerPieces[side][5]:
+            return False
+        right, empties, crossed = rule
+        if not (pos.castle_perm & right):
+            return False
+        for sq in empties:
+            if pieces[sq] != EMPTY:
+                return False
+        for sq in crossed:
+            if pos.is_sq_attacked(sq, enemy):
+                return False
+    elif move & MFLAG_EP:
+        if not PiecePawn[pce] or to_sq != pos.en_passant or captured != EMPTY or promoted != EMPTY:
+            return False
+        if not (PawnAttacks[side][from64] & SqBB[to_sq]):
+            return False
+        return _ep_is_legal(pos, from_sq, to_sq, pos.king_sq[side], occ)
+    else:
+        if target != captured:
+            return False
+        if target != EMPTY and PieceCol[target] != enemy:
+            return False
+
+        if PiecePawn[pce]:
+            fwd = 10 if side == WHITE else -10
+            if move & MFLAG_PS:
+                start_rank = RANK_2 if side == WHITE else RANK_7
+                if (
+                    RanksBoard[from_sq] != start_rank
+                    or to_sq != from_sq + 2 * fwd
+                    or pieces[from_sq + fwd] != EMPTY
+                    or target != EMPTY
+                ):
+                    return False
+            elif target == EMPTY:
+                if to_sq != from_sq + fwd:
+                    return False
+            elif not (PawnAttacks[side][from64] & SqBB[to_sq]):
+                return False
+
+            promo_rank = RANK_8 if side == WHITE else RANK_1
+            if RanksBoard[to_sq] == promo_rank:
+                if (
+                    promoted == EMPTY
+                    or PieceCol[promoted] != side
+                    or PiecePawn[promoted]
+                    or PceKing[promoted]
+                ):
+                    return False
+            elif promoted != EMPTY:
+                return False
+        else:
+            if promoted != EMPTY or move & MFLAG_PS:
+                return False
+            if not (piece_attacks(pce, from64, occ) & SqBB[to_sq]):
+                return False
+
+    # King safety on the board after the move; a captured piece stops attacking.
+    king_sq = to_sq if from_sq == pos.king_sq[side] else pos.king_sq[side]
+    occ_after = (occ ^ SqBB[from_sq]) | SqBB[to_sq]
+    return not (pos.attackers_to(king_sq, enemy, occ_after) & ~SqBB[to_sq])
+
+def MoveExists(pos, move):
+    """
+    Returns True if `move` is legal in the current position.
+    """
+    move_list = ScratchMoveList
+    GenerateLegalMoves(pos, move_list)
 
     for move_num in range(move_list.count):
-        candidate = move_list.moves[move_num].move
-        if not MakeMove(pos, candidate):
-            continue
-        TakeMove(pos)
-        if candidate == move:
+        if move_list.moves[move_num] == move:
             return True
     return False
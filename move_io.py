@@ -1,6 +1,6 @@
 from defs import FilesBoard, RanksBoard, FROMSQ, TOSQ, PROMOTED, Pieces, FR2SQ, Side
 from validate import FileRankValid
-from move_gen import GenerateAllMoves, MoveList
+from move_gen import GenerateLegalMoves, ScratchMoveList
 from make_mov import MakeMove, TakeMove
 
 NOMOVE = 0
@@ -61,11 +61,11 @@ def ParseMove(move_str, board):
     to_sq = FR2SQ(to_file, to_rank)
     prom_char = move_str[4] if len(move_str) > 4 else None
 
-    move_list = MoveList()
-    GenerateAllMoves(board, move_list)
+    move_list = ScratchMoveList
+    GenerateLegalMoves(board, move_list)
 
     for i in range(move_list.count):
-        move = move_list.moves[i].move
+        move = move_list.moves[i]
         if FROMSQ(move) != from_sq or TOSQ(move) != to_sq:
             continue
 
@@ -99,9 +99,6 @@ def ParseMove(move_str, board):
         elif prom_char is not None:
             continue
 
-        # Ensure returned move is legal in current position.
-        if MakeMove(board, move):
-            TakeMove(board)
-            return move
+        return move
 
     return NOMOVE
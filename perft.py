@@ -1,36 +1,109 @@
 # perft.py
-from move_gen import GenerateAllMoves, MoveList
+from array import array
+
+import defs
+from defs import SampledCheckBoard, AllInit, Board
+from move_gen import GenerateLegalMoves, MoveList, MoveStack
 from make_mov import MakeMove, TakeMove
 from move_io import PrMove
 from misc import GetTimeMs
 
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
 # This is the core recursive function
 def Perft(depth, board):
-    assert board.check_board()
+    if defs.CHECK_BOARD_EVERY:
+        SampledCheckBoard(board)
 
     # Base case: if we reach depth 0, we've found 1 leaf node
     if depth == 0:
         return 1
     
     nodes = 0
-    move_list = MoveList()
-    GenerateAllMoves(board, move_list)
+    # Each remaining depth owns one preallocated list for the whole run.
+    move_list = MoveStack[depth]
+    GenerateLegalMoves(board, move_list)
+
+    # Every generated move is legal, so the last ply is just a count.
+    if depth == 1:
+        return move_list.count
     
     for i in range(move_list.count):
-        move = move_list.moves[i].move
+        move = move_list.moves[i]
         
-        if not MakeMove(board, move):
-            continue
+        MakeMove(board, move)
             
         # Recursively call Perft for the next depth
         nodes += Perft(depth - 1, board)
         
         # Always take back the move to keep the board state consistent
         TakeMove(board)
-        assert board.check_board()
         
     return nodes
 
+# --- Perft transposition cache ---
+# Direct-mapped, keyed on (pos_key, depth). Transpositions are everywhere in
+# perft trees, so a subtree counted once is never walked again.
+
+DEFAULT_PERFT_HASH_SIZE_MB = 16
+# key (U64) + node count (U64) + depth (1 byte)
+PERFT_HASH_ENTRY_BYTES = 8 + 8 + 1
+
+
+class PerftHashTable:
+    __slots__ = ("keys", "nodes", "depths", "num_entries", "hits", "misses")
+
+    def __init__(self):
+        self.keys = array("Q")
+        self.nodes = array("Q")
+        self.depths = array("B")
+        self.num_entries = 0
+        self.hits = 0
+        self.misses = 0
+
+
+def InitPerftHash(table, size_mb=DEFAULT_PERFT_HASH_SIZE_MB):
+    num_entries = int(size_mb * 1024 * 1024) // PERFT_HASH_ENTRY_BYTES
+    if num_entries < 1:
+        num_entries = 1
+    table.num_entries = num_entries
+    ClearPerftHash(table)
+
+
+def ClearPerftHash(table):
+    n = table.num_entries
+    table.keys = array("Q", bytes(8 * n))
+    table.nodes = array("Q", bytes(8 * n))
+    table.depths = array("B", bytes(n))
+    table.hits = 0
+    table.misses = 0
+
+
+def PerftCached(depth, board, table):
+    # Depth 0/1 are cheaper to count than to look up.
+    if depth <= 1:
+        return Perft(depth, board)
+
+    key = board.pos_key
+    index = key % table.num_entries
+    if table.keys[index] == key and table.depths[index] == depth:
+        table.hits += 1
+        return table.nodes[index]
+    table.misses += 1
+
+    nodes = 0
+    move_list = MoveStack[depth]
+    GenerateLegalMoves(board, move_list)
+    for i in range(move_list.count):
+        MakeMove(board, move_list.moves[i])
+        nodes += PerftCached(depth - 1, board, table)
+        TakeMove(board)
+
+    table.keys[index] = key
+    table.depths[index] = depth
+    table.nodes[index] = nodes
+    return nodes
+
 # This is the 'Divide' version to help debug specific move branches
 def PerftTest(depth, board, expected_nodes=None, label=""):
     print(f"\n--- Starting Perft Test: Depth {depth} ---")
@@ -39,13 +112,13 @@ def PerftTest(depth, board, expected_nodes=None, label=""):
     start_ms = GetTimeMs()
     
     move_list = MoveList()
-    GenerateAllMoves(board, move_list)
+    GenerateLegalMoves(board, move_list)
     
     total_nodes = 0
     
     # Loop through each move at the root individually
     for i in range(move_list.count):
-        move = move_list.moves[i].move
+        move = move_list.moves[i]
         
         if not MakeMove(board, move):
             continue
@@ -98,3 +171,253 @@ def PerftBenchmark(depth, board, expected_nodes=None, label=""):
             print(f"Result: FAIL (expected {expected_nodes}, got {total_nodes})")
 
     return total_nodes
+
+# --- Parallel perft ---
+# The root moves (or every depth-2 line) become tasks on a process pool.
+# A task is the root FEN plus the moves leading to its subtree, so each
+# worker rebuilds the position with parse_fen and needs no shared state.
+# Every worker keeps its own perft cache for all the tasks it is given.
+
+WorkerPerftHash = None
+
+
+def _perft_worker_init(hash_mb):
+    global WorkerPerftHash
+    AllInit()
+    WorkerPerftHash = None
+    if hash_mb > 0:
+        WorkerPerftHash = PerftHashTable()
+        InitPerftHash(WorkerPerftHash, hash_mb)
+
+
+def _perft_task(fen, path, depth):
+    board = Board.from_fen(fen)
+    for move in path:
+        MakeMove(board, move)
+    if WorkerPerftHash is None:
+        return Perft(depth, board)
+    return PerftCached(depth, board, WorkerPerftHash)
+
+
+def _perft_frontier(board, split_depth):
+    # Every legal line of split_depth moves from the root, in generation order.
+    if split_depth == 0:
+        return [[]]
+    move_list = MoveList()
+    GenerateLegalMoves(board, move_list)
+    paths = []
+    for i in range(move_list.count):
+        move = move_list.moves[i]
+        MakeMove(board, move)
+        for tail in _perft_frontier(board, split_depth - 1):
+            paths.append([move] + tail)
+        TakeMove(board)
+    return paths
+
+
+def ParallelPerftTest(depth, board, workers=1, split_depth=1, hash_mb=0, expected_nodes=None, label=""):
+    """
+    PerftTest with the work spread over a ProcessPoolExecutor.
+    Prints the same divide lines as PerftTest (one per root move).
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    print(f"\n--- Starting Perft Test: Depth {depth} ---")
+    if label:
+        print(f"Position: {label}")
+    start_ms = GetTimeMs()
+
+    move_list = MoveList()
+    GenerateLegalMoves(board, move_list)
+    split_depth = max(1, min(split_depth, depth))
+    fen = board.to_fen()
+
+    with ProcessPoolExecutor(max_workers=max(1, workers), initializer=_perft_worker_init, initargs=(hash_mb,)) as pool:
+        tasks = []
+        for i in range(move_list.count):
+            move = move_list.moves[i]
+            MakeMove(board, move)
+            paths = [[move] + tail for tail in _perft_frontier(board, split_depth - 1)]
+            TakeMove(board)
+            tasks.append([pool.submit(_perft_task, fen, path, depth - split_depth) for path in paths])
+
+        total_nodes = 0
+        for i in range(move_list.count):
+            branch_nodes = sum(future.result() for future in tasks[i])
+            total_nodes += branch_nodes
+            print(f"Move {i+1:2}: {PrMove(move_list.moves[i])} : {branch_nodes}")
+
+    elapsed_ms = GetTimeMs() - start_ms
+    elapsed_s = elapsed_ms / 1000.0
+
+    print(f"\nTest Complete: {total_nodes} nodes visited.")
+    print(f"Time: {elapsed_ms}ms ({elapsed_s:.2f}s)")
+    if elapsed_ms > 0:
+        print(f"Nodes per second: {int((total_nodes * 1000) / elapsed_ms)}")
+
+    if expected_nodes is not None:
+        if total_nodes == expected_nodes:
+            print(f"Result: PASS (expected {expected_nodes})")
+        else:
+            print(f"Result: FAIL (expected {expected_nodes}, got {total_nodes})")
+
+    return total_nodes
+
+
+# --- EPD regression suite ---
+# perftsuite.epd lines look like: <FEN> ;id <name> ;D1 <nodes> ;D2 <nodes> ...
+# Every depth runs serially through Perft, so the NPS figures track the raw
+# speed of move generation and make/unmake from one commit to the next.
+
+DEFAULT_PERFT_SUITE = "perftsuite.epd"
+
+
+def LoadPerftSuite(path=DEFAULT_PERFT_SUITE):
+    entries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            fields = [field.strip() for field in line.split(";")]
+            entry = {"id": "", "fen": fields[0], "depths": {}}
+            for field in fields[1:]:
+                tag, _, value = field.partition(" ")
+                if tag == "id":
+                    entry["id"] = value.strip()
+                elif tag[:1] == "D" and tag[1:].isdigit():
+                    entry["depths"][int(tag[1:])] = int(value)
+            if not entry["id"]:
+                entry["id"] = f"pos{len(entries) + 1}"
+            entries.append(entry)
+    return entries
+
+
+def _nps(nodes, elapsed_ms):
+    return int((nodes * 1000) / elapsed_ms) if elapsed_ms > 0 else 0
+
+
+def RunPerftSuite(entries, max_depth=None, verbose=True):
+    """
+    Checks every listed depth of every position (up to max_depth).
+    Returns a JSON-ready report with per-depth and per-position NPS.
+    """
+    suite_start = GetTimeMs()
+    positions = []
+    failures = 0
+
+    for entry in entries:
+        board = Board.from_fen(entry["fen"])
+        results = []
+        pos_nodes = 0
+        pos_ms = 0
+        for depth in sorted(entry["depths"]):
+            if max_depth is not None and depth > max_depth:
+                continue
+            expected = entry["depths"][depth]
+            start_ms = GetTimeMs()
+            nodes = Perft(depth, board)
+            elapsed_ms = GetTimeMs() - start_ms
+            ok = nodes == expected
+            if not ok:
+                failures += 1
+            pos_nodes += nodes
+            pos_ms += elapsed_ms
+            results.append({
+                "depth": depth,
+                "expected": expected,
+                "nodes": nodes,
+                "ok": ok,
+                "ms": elapsed_ms,
+                "nps": _nps(nodes, elapsed_ms),
+            })
+            if verbose:
+                status = "PASS" if ok else f"FAIL (expected {expected})"
+                print(
+                    f"{entry['id']:<24} D{depth} {nodes:>10} "
+                    f"{elapsed_ms:>7}ms {_nps(nodes, elapsed_ms):>8} nps  {status}"
+                )
+
+        positions.append({
+            "id": entry["id"],
+            "fen": entry["fen"],
+            "ok": all(r["ok"] for r in results),
+            "nodes": pos_nodes,
+            "ms": pos_ms,
+            "nps": _nps(pos_nodes, pos_ms),
+            "depths": results,
+        })
+
+    wall_ms = GetTimeMs() - suite_start
+    total_nodes = sum(p["nodes"] for p in positions)
+    search_ms = sum(p["ms"] for p in positions)
+    report = {
+        "max_depth": max_depth,
+        "positions": positions,
+        "failures": failures,
+        "passed": failures == 0,
+        "total_nodes": total_nodes,
+        "wall_ms": wall_ms,
+        "nps": _nps(total_nodes, search_ms),
+    }
+
+    if verbose:
+        print(
+            f"\nSuite: {len(positions)} positions, {total_nodes} nodes, "
+            f"{wall_ms}ms wall, {report['nps']} nps, "
+            f"{'PASS' if failures == 0 else f'{failures} FAILED'}"
+        )
+    return report
+
+
+def main(argv=None):
+    import argparse
+    import os
+
+    parser = argparse.ArgumentParser(description="Hydra perft (divide) runner")
+    parser.add_argument("depth", type=int, nargs="?", default=None)
+    parser.add_argument("--fen", default=START_FEN)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--split", type=int, default=1, choices=(1, 2),
+                        help="1 = one task per root move, 2 = one per depth-2 line")
+    parser.add_argument("--hash", type=int, default=0, metavar="MB",
+                        help="per-worker perft cache size (0 = off)")
+    parser.add_argument("--expected", type=int, default=None)
+    parser.add_argument("--suite", nargs="?", const=DEFAULT_PERFT_SUITE, default=None, metavar="EPD",
+                        help=f"run an EPD perft suite instead (default {DEFAULT_PERFT_SUITE})")
+    parser.add_argument("--max-depth", type=int, default=None,
+                        help="skip suite depths above this")
+    parser.add_argument("--json", default=None, metavar="PATH",
+                        help="write the suite report as JSON")
+    args = parser.parse_args(argv)
+
+    AllInit()
+    if args.suite is not None:
+        import json
+
+        report = RunPerftSuite(LoadPerftSuite(args.suite), max_depth=args.max_depth)
+        report["suite"] = args.suite
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+        return 0 if report["passed"] else 1
+
+    if args.depth is None:
+        parser.error("a depth is required unless --suite is given")
+    board = Board.from_fen(args.fen)
+    total = ParallelPerftTest(
+        args.depth,
+        board,
+        workers=args.workers,
+        split_depth=args.split,
+        hash_mb=args.hash,
+        expected_nodes=args.expected,
+        label=args.fen,
+    )
+    if args.expected is not None and total != args.expected:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
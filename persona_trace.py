@@ -103,8 +103,11 @@ def _collect_move_trace(board, move):
     reply_sum_sq = 0.0
 
     for i in range(reply_list.count):
-        reply_move = reply_list.moves[i].move
+        reply_move = reply_list.moves[i]
         reply_is_capture = CAPTURED(reply_move) != Pieces.EMPTY or (reply_move & MFLAG_EP) != 0
+        # A reply capture that SEE says loses material is not a real threat,
+        # so it should not drag reply_min_cp down via the static eval.
+        reply_see = board.see(reply_move) if reply_is_capture else 0
 
         if not MakeMove(board, reply_move):
             continue
@@ -116,7 +119,8 @@ def _collect_move_trace(board, move):
         reply_count += 1
         if reply_is_capture:
             reply_capture_count += 1
-        reply_min_cp = min(reply_min_cp, cp)
+        if reply_see >= 0:
+            reply_min_cp = min(reply_min_cp, cp)
         reply_max_cp = max(reply_max_cp, cp)
         reply_sum += cp
         reply_sum_sq += cp * cp
@@ -132,6 +136,9 @@ def _collect_move_trace(board, move):
             reply_mean_cp = 0.0
         reply_vol_cp = 0.0
     else:
+        if reply_min_cp > reply_max_cp:
+            # every reply was a losing capture
+            reply_min_cp = reply_max_cp
         reply_mean_cp = reply_sum / reply_count
         variance = max(0.0, (reply_sum_sq / reply_count) - (reply_mean_cp * reply_mean_cp))
         reply_vol_cp = math.sqrt(variance)
@@ -240,7 +247,7 @@ def choose_trace_personality_move(board, depth, movetime_ms, personality, baseli
 
     traces = []
     for i in range(move_list.count):
-        trace = _collect_move_trace(board, move_list.moves[i].move)
+        trace = _collect_move_trace(board, move_list.moves[i])
         if trace is not None:
             traces.append(trace)
 
@@ -16,6 +16,9 @@ from defs import (
     File,
     Ranks,
     SqOnBoard,
+    Sq120to64,
+    piece_attacks,
+    bitboard_squares,
 )
 from make_mov import MakeMove, TakeMove
 from move_gen import GenerateAllMoves, MoveList
@@ -65,56 +68,14 @@ def _is_center_square(sq):
 
 
 def _attacked_squares_for_piece(board, sq, piece):
-    out = []
     side = PieceCol[piece]
+    attacks = piece_attacks(piece, Sq120to64[sq], board.occupancy[Side.BOTH])
 
-    if piece in (Pieces.wP, Pieces.bP):
-        offs = (9, 11) if side == Side.WHITE else (-9, -11)
-        for off in offs:
-            t = sq + off
-            if SqOnBoard(t):
-                out.append(t)
-        return out
-
-    if piece in (Pieces.wN, Pieces.bN):
-        for d in KN_DIR:
-            t = sq + d
-            if not SqOnBoard(t):
-                continue
-            p = board.pieces[t]
-            if p == Pieces.EMPTY or PieceCol[p] != side:
-                out.append(t)
-        return out
-
-    if piece in (Pieces.wK, Pieces.bK):
-        for d in KI_DIR:
-            t = sq + d
-            if not SqOnBoard(t):
-                continue
-            p = board.pieces[t]
-            if p == Pieces.EMPTY or PieceCol[p] != side:
-                out.append(t)
-        return out
-
-    if piece in (Pieces.wB, Pieces.bB):
-        dirs = BI_DIR
-    elif piece in (Pieces.wR, Pieces.bR):
-        dirs = RK_DIR
-    else:
-        dirs = BI_DIR + RK_DIR
-
-    for d in dirs:
-        t = sq + d
-        while SqOnBoard(t):
-            p = board.pieces[t]
-            if p == Pieces.EMPTY:
-                out.append(t)
-                t += d
-                continue
-            if PieceCol[p] != side:
-                out.append(t)
-            break
-    return out
+    # Pawns report both diagonals regardless of what stands there.
+    if piece not in (Pieces.wP, Pieces.bP):
+        attacks &= ~board.occupancy[side]
+    # Lowest square first; callers that print squares fix their own order.
+    return bitboard_squares(attacks)
 
 
 def _mobility_for_types(board, side, piece_types):
@@ -285,6 +246,8 @@ def _knight_fork_ideas(board, side):
         if sq == Square.NO_SQ:
             continue
         attacked = _attacked_squares_for_piece(board, sq, knight)
+        # Name the targets in KN_DIR order, as the fork text always has.
+        attacked.sort(key=lambda t: KN_DIR.index(t - sq))
         major_targets = []
         for t in attacked:
             p = board.pieces[t]
@@ -583,14 +546,16 @@ def _basic_warning_lines(board, actor_side):
             sq = board.p_list[pce][i]
             if sq == Square.NO_SQ:
                 continue
-            if board.is_sq_attacked(sq, enemy) and not board.is_sq_attacked(sq, actor_side):
-                hanging.append((PieceVal[pce], pce, sq))
+            # SEE also catches pieces that are defended but attacked by something cheaper.
+            loss = board.see_square(sq, enemy)
+            if loss > 0:
+                hanging.append((loss, pce, sq))
 
     if hanging:
         hanging.sort(reverse=True)
         top = hanging[0]
         warnings.append(
-            f"Hanging piece warning: {_sq_to_alg(top[2])} {PIECE_NAME[top[1]]} is attacked and undefended."
+            f"Hanging piece warning: {_sq_to_alg(top[2])} {PIECE_NAME[top[1]]} is attacked and not adequately defended."
         )
 
     # Board is already in post-move state; side to move should be enemy.
@@ -599,7 +564,7 @@ def _basic_warning_lines(board, actor_side):
         GenerateAllMoves(board, move_list)
         checking_moves = []
         for i in range(move_list.count):
-            mv = move_list.moves[i].move
+            mv = move_list.moves[i]
             if not MakeMove(board, mv):
                 continue
             gives_check = board.is_sq_attacked(board.king_sq[actor_side], enemy)
@@ -1,21 +1,17 @@
-from dataclasses import dataclass
+from array import array
 from defs import MAXDEPTH
 
 NOMOVE = 0
 DEFAULT_PV_SIZE_MB = 2
 
 
-@dataclass
-class PVEntry:
-    pos_key: int = 0
-    move: int = NOMOVE
-
-
 class PVTable:
-    __slots__ = ("p_table", "num_entries")
+    __slots__ = ("keys", "moves", "num_entries")
 
     def __init__(self):
-        self.p_table = []
+        # Parallel arrays: keys[i] is the pos_key owning slot i, moves[i] its PV move.
+        self.keys = array("Q")
+        self.moves = array("i")
         self.num_entries = 0
 
 
@@ -33,14 +29,14 @@ def InitPvTable(pv_table, size_mb=DEFAULT_PV_SIZE_MB):
         num_entries = 1
 
     pv_table.num_entries = int(num_entries)
-    pv_table.p_table = [PVEntry() for _ in range(pv_table.num_entries)]
-    ClearPvTable(pv_table)
+    pv_table.keys = array("Q", bytes(8 * pv_table.num_entries))
+    pv_table.moves = array("i", bytes(4 * pv_table.num_entries))
 
 
 def ClearPvTable(pv_table):
-    for i in range(pv_table.num_entries):
-        pv_table.p_table[i].pos_key = 0
-        pv_table.p_table[i].move = NOMOVE
+    n = pv_table.num_entries
+    pv_table.keys[:] = array("Q", bytes(8 * n))
+    pv_table.moves[:] = array("i", bytes(4 * n))
 
 
 def StorePvMove(pos, move):
@@ -51,8 +47,8 @@ def StorePvMove(pos, move):
     index = pos.pos_key % pv_table.num_entries
     assert 0 <= index <= pv_table.num_entries - 1
 
-    pv_table.p_table[index].pos_key = pos.pos_key
-    pv_table.p_table[index].move = move
+    pv_table.keys[index] = pos.pos_key
+    pv_table.moves[index] = move
 
 
 def ProbePvTable(pos):
@@ -63,9 +59,8 @@ def ProbePvTable(pos):
     index = pos.pos_key % pv_table.num_entries
     assert 0 <= index <= pv_table.num_entries - 1
 
-    entry = pv_table.p_table[index]
-    if entry.pos_key == pos.pos_key:
-        return entry.move
+    if pv_table.keys[index] == pos.pos_key:
+        return pv_table.moves[index]
     return NOMOVE
 
 
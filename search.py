@@ -1,7 +1,7 @@
+import time
+from array import array
+
 from defs import (
-    Side,
-    Pieces,
-    Square,
     MAX_GAME_MOVES,
     MAXDEPTH,
     PieceVal,
@@ -11,23 +11,47 @@ from defs import (
     PROMOTED,
     MFLAG_EP,
     SearchInfo,
+    AllInit,
+)
+from consts import EMPTY, NO_SQ, WHITE, wN, wB, wR, wQ, bN, bB, bR, bQ
+from move_gen import (
+    GenerateAllMoves,
+    GenerateAllCaps,
+    GenerateLegalMoves,
+    GenerateLegalCaps,
+    GenerateLegalQuiets,
+    MoveIsLegal,
+    MoveList,
+    MoveStack,
 )
-from move_gen import GenerateAllMoves, GenerateAllCaps, MoveList
-from make_mov import MakeMove, TakeMove
+from make_mov import MakeMove, TakeMove, UNREP_KEY
 from move_io import PrMove
-from misc import GetTimeMs, ReadInput
-from pvtable import ProbePvTable, StorePvMove, ClearPvTable, GetPvLine
-from evaluate import EvalPosition
+from misc import GetTimeMs, ReadInput, SendLine
+from pvtable import ProbePvTable, StorePvMove, ClearPvTable, GetPvLine, InitPvTable
+from evaluate import EvalPosition, EvalHash, PawnHash, InitEvalHash, InitPawnHash
+from ttable import (
+    HashTable,
+    InitHashTable,
+    InitSharedHashTable,
+    AttachSharedHashTable,
+    CloseSharedHashTable,
+    ClearHashTable,
+    AgeHashTable,
+    ProbeHashEntry,
+    ProbeHashEntryEval,
+    StoreHashEntry,
+    TT_EXACT,
+    TT_ALPHA,
+    TT_BETA,
+)
 
 INF = 30000
 MATE = 29000
 MAX_PLY = MAXDEPTH
 
-TT_EXACT = 0
-TT_ALPHA = 1
-TT_BETA = 2
-TT_MAX_ENTRIES = 250_000
-TT = {}
+TT_SIZE_MB = 16
+TT = HashTable()
+InitHashTable(TT, TT_SIZE_MB)
 DELTA_MARGIN = 200
 
 
@@ -36,38 +60,39 @@ def _eval_for_side_to_move(board):
 
 
 def _is_capture_move(move):
-    return CAPTURED(move) != Pieces.EMPTY or (move & MFLAG_EP)
+    return CAPTURED(move) != EMPTY or (move & MFLAG_EP)
 
 
 def _has_non_pawn_material(board):
-    if board.side == Side.WHITE:
+    if board.side == WHITE:
         return (
-            board.pce_num[Pieces.wN]
-            + board.pce_num[Pieces.wB]
-            + board.pce_num[Pieces.wR]
-            + board.pce_num[Pieces.wQ]
+            board.pce_num[wN]
+            + board.pce_num[wB]
+            + board.pce_num[wR]
+            + board.pce_num[wQ]
         ) > 0
     return (
-        board.pce_num[Pieces.bN]
-        + board.pce_num[Pieces.bB]
-        + board.pce_num[Pieces.bR]
-        + board.pce_num[Pieces.bQ]
+        board.pce_num[bN]
+        + board.pce_num[bB]
+        + board.pce_num[bR]
+        + board.pce_num[bQ]
     ) > 0
 
 
 def _make_null_move(board):
-    from hashkeys import PieceKeys, SideKey
+    from hashkeys import EpKeys, SideKey
 
+    if board.his_ply >= len(board.history):
+        board.grow_history()
     board.history[board.his_ply].pos_key = board.pos_key
     board.history[board.his_ply].move = 0
     board.history[board.his_ply].fifty_move = board.fifty_move
     board.history[board.his_ply].en_passant = board.en_passant
     board.history[board.his_ply].castle_perm = board.castle_perm
+    board.rep_keys[board.pos_key] = board.rep_keys.get(board.pos_key, 0) + 1
 
-    if board.en_passant != Square.NO_SQ:
-        board.pos_key ^= PieceKeys[Pieces.EMPTY][board.en_passant]
-
-    board.en_passant = Square.NO_SQ
+    board.pos_key ^= EpKeys[board.en_passant]
+    board.en_passant = NO_SQ
     board.side ^= 1
     board.pos_key ^= SideKey
 
@@ -87,26 +112,43 @@ def _take_null_move(board):
     board.fifty_move = board.history[board.his_ply].fifty_move
     board.en_passant = board.history[board.his_ply].en_passant
     board.pos_key = board.history[board.his_ply].pos_key
+    UNREP_KEY(board)
 
 
 def CheckUp(info):
     if info.time_set and GetTimeMs() >= info.stop_time:
         info.stopped = True
+    if info.stop_event is not None and info.stop_event.is_set():
+        info.stopped = True
     ReadInput(info)
 
 
+def PonderHit(info):
+    # The expected move was played: keep searching, now on the clock.
+    if info.ponder_time > 0:
+        info.stop_time = GetTimeMs() + info.ponder_time
+        info.time_set = 1
+    info.ponder = 0
+
+
+def WaitWhilePondering(info):
+    # A ponder search must not answer before ponderhit or stop.
+    while info.ponder and not info.stopped:
+        time.sleep(0.005)
+        CheckUp(info)
+
+
 def IsRepetition(board):
-    assert 0 <= board.his_ply <= MAX_GAME_MOVES
-    assert 0 <= board.fifty_move <= MAX_GAME_MOVES
+    # O(1): rep_keys counts every key in history (see Board.rep_keys)
+    return board.pos_key in board.rep_keys
 
-    start = max(0, board.his_ply - board.fifty_move)
-    assert 0 <= start <= board.his_ply
 
-    for i in range(start, board.his_ply):
-        assert 0 <= i < MAX_GAME_MOVES
-        if board.history[i].pos_key == board.pos_key:
-            return True
-    return False
+def _is_losing_capture(board, move):
+    # Taking something worth at least the attacker cannot lose material,
+    # so SEE is only needed for "bigger takes smaller" captures.
+    if PieceVal[CAPTURED(move)] >= PieceVal[board.pieces[FROMSQ(move)]]:
+        return False
+    return board.see(move) < 0
 
 
 def _score_move(board, move, ply, pv_move, base_move_score):
@@ -127,71 +169,116 @@ def _score_move(board, move, ply, pv_move, base_move_score):
 
 
 def _order_moves(board, move_list, ply, pv_move):
+    moves = move_list.moves
+    scores = move_list.scores
     for i in range(move_list.count):
-        move = move_list.moves[i].move
-        base_score = move_list.moves[i].score
-        move_list.moves[i].score = _score_move(board, move, ply, pv_move, base_score)
-
-
-def _sort_move_list(move_list):
-    if move_list.count > 1:
-        move_list.moves[: move_list.count] = sorted(
-            move_list.moves[: move_list.count], key=lambda m: m.score, reverse=True
-        )
+        scores[i] = _score_move(board, moves[i], ply, pv_move, scores[i])
 
 
 def PickNextMove(move_num, move_list):
     best_num = move_num
     best_score = 0
+    scores = move_list.scores
 
     for index in range(move_num, move_list.count):
-        if move_list.moves[index].score > best_score:
-            best_score = move_list.moves[index].score
+        if scores[index] > best_score:
+            best_score = scores[index]
             best_num = index
 
-    temp = move_list.moves[move_num]
-    move_list.moves[move_num] = move_list.moves[best_num]
-    move_list.moves[best_num] = temp
+    if best_num != move_num:
+        moves = move_list.moves
+        moves[move_num], moves[best_num] = moves[best_num], moves[move_num]
+        scores[move_num], scores[best_num] = scores[best_num], scores[move_num]
 
 
-def _tt_get_entry(pos_key):
-    return TT.get(pos_key)
+def _staged_moves(board, move_list, ply, hash_move):
+    """
+    Legal moves for a node that is not in check, best first, built lazily:
+    hash/PV move, winning/equal captures by MVV-LVA, killers, history-scored
+    quiets, then the captures SEE says lose material.
+    A cutoff stops the caller iterating, so later stages are never generated.
+    """
+    if hash_move != 0 and MoveIsLegal(board, hash_move):
+        yield hash_move
+    else:
+        hash_move = 0
+
+    losing_captures = None
+    GenerateLegalCaps(board, move_list)
+    for move_num in range(move_list.count):
+        PickNextMove(move_num, move_list)
+        move = move_list.moves[move_num]
+        if move == hash_move:
+            continue
+        if _is_losing_capture(board, move):
+            if losing_captures is None:
+                losing_captures = []
+            losing_captures.append(move)
+            continue
+        yield move
+
+    killer_1 = board.search_killers[0][ply]
+    killer_2 = board.search_killers[1][ply]
+    if killer_1 != hash_move and not _is_capture_move(killer_1) and MoveIsLegal(board, killer_1):
+        yield killer_1
+    if (
+        killer_2 != killer_1
+        and killer_2 != hash_move
+        and not _is_capture_move(killer_2)
+        and MoveIsLegal(board, killer_2)
+    ):
+        yield killer_2
+
+    GenerateLegalQuiets(board, move_list)
+    moves = move_list.moves
+    scores = move_list.scores
+    pieces = board.pieces
+    search_history = board.search_history
+    for i in range(move_list.count):
+        move = moves[i]
+        scores[i] = search_history[pieces[FROMSQ(move)]][TOSQ(move)]
+
+    for move_num in range(move_list.count):
+        PickNextMove(move_num, move_list)
+        move = moves[move_num]
+        if move != hash_move and move != killer_1 and move != killer_2:
+            yield move
+
+    # Already in MVV-LVA order from the capture stage.
+    if losing_captures is not None:
+        for move in losing_captures:
+            yield move
+
+
+def _evasion_moves(board, move_list, ply, hash_move):
+    # In check there are only a handful of legal replies: generate them all,
+    # score once and still hand them out one at a time.
+    GenerateLegalMoves(board, move_list)
+    _order_moves(board, move_list, ply, hash_move)
+    for move_num in range(move_list.count):
+        PickNextMove(move_num, move_list)
+        yield move_list.moves[move_num]
 
 
 def _tt_probe(pos_key, depth, alpha, beta):
-    entry = TT.get(pos_key)
-    if entry is None:
-        return None, 0
-
-    move = entry["move"]
-    if entry["depth"] < depth:
-        return None, move
-
-    score = entry["score"]
-    flag = entry["flag"]
-    if flag == TT_EXACT:
-        return score, move
-    if flag == TT_ALPHA and score <= alpha:
-        return score, move
-    if flag == TT_BETA and score >= beta:
-        return score, move
-    return None, move
-
-
-def _tt_store(pos_key, depth, score, flag, move):
-    if len(TT) >= TT_MAX_ENTRIES:
-        TT.clear()
-    TT[pos_key] = {
-        "depth": depth,
-        "score": score,
-        "flag": flag,
-        "move": move,
-    }
+    return ProbeHashEntry(TT, pos_key, depth, alpha, beta)
 
 
-def ClearForSearch(board, info):
-    ClearPvTable(board.pv_table)
-    TT.clear()
+def _tt_store(pos_key, depth, score, flag, move, static_eval=None):
+    StoreHashEntry(TT, pos_key, move, score, flag, depth, static_eval)
+
+
+def ClearForSearch(board, info, clear_hash=False, age_hash=True):
+    # The TT and PV table outlive the search: each new search only starts a
+    # new TT generation, so stale entries become the preferred victims while
+    # the rest still give cutoffs and move ordering. ClearForNewGame (or
+    # clear_hash=True) wipes both.
+    board.alloc_search_state()
+    if clear_hash:
+        ClearPvTable(board.pv_table)
+        ClearHashTable(TT)
+    elif age_hash:
+        AgeHashTable(TT)
     for i in range(2):
         for j in range(MAX_PLY):
             board.search_killers[i][j] = 0
@@ -205,6 +292,36 @@ def ClearForSearch(board, info):
     info.stopped = 0
     info.fh = 0.0
     info.fhf = 0.0
+    # The eval cache itself survives; only its counters are per search.
+    EvalHash.hits = 0
+    EvalHash.misses = 0
+
+
+def ClearForNewGame(board):
+    """Forget everything learned in earlier searches (ucinewgame)."""
+    board.alloc_search_state()
+    ClearPvTable(board.pv_table)
+    ClearHashTable(TT)
+
+
+def ResizeSearchTables(board, hash_mb=None, pv_mb=None, eval_mb=None, pawn_mb=None):
+    """
+    Reallocate the TT, the board's PV table and the eval/pawn caches (UCI
+    setoption). Sizes are in MB; None leaves that table alone. Every table
+    that is resized starts empty.
+    """
+    global TT_SIZE_MB
+    if hash_mb is not None:
+        # Lazy SMP sizes its shared table from TT_SIZE_MB too.
+        TT_SIZE_MB = hash_mb
+        InitHashTable(TT, hash_mb)
+    if pv_mb is not None:
+        board.alloc_search_state()
+        InitPvTable(board.pv_table, pv_mb)
+    if eval_mb is not None:
+        InitEvalHash(EvalHash, eval_mb)
+    if pawn_mb is not None:
+        InitPawnHash(PawnHash, pawn_mb)
 
 
 def MinMax(board, depth, maximizing_player):
@@ -218,7 +335,7 @@ def MinMax(board, depth, maximizing_player):
     if maximizing_player:
         best_score = -INF
         for i in range(move_list.count):
-            move = move_list.moves[i].move
+            move = move_list.moves[i]
             if not MakeMove(board, move):
                 continue
             legal_moves += 1
@@ -229,7 +346,7 @@ def MinMax(board, depth, maximizing_player):
     else:
         best_score = INF
         for i in range(move_list.count):
-            move = move_list.moves[i].move
+            move = move_list.moves[i]
             if not MakeMove(board, move):
                 continue
             legal_moves += 1
@@ -258,7 +375,7 @@ def NegaMax(board, depth, stats=None):
     legal_moves = 0
 
     for i in range(move_list.count):
-        move = move_list.moves[i].move
+        move = move_list.moves[i]
         if not MakeMove(board, move):
             continue
         legal_moves += 1
@@ -289,47 +406,74 @@ def Quiescence(alpha, beta, board, info):
     if board.ply >= MAX_PLY - 1:
         return EvalPosition(board)
 
+    # Q-nodes probe and store at depth 0: any entry resolves the window here,
+    # while AlphaBeta (depth >= 1) never takes a cutoff from a q-entry.
+    pos_key = board.pos_key
+    alpha_orig = alpha
+    tt_score, tt_move, tt_eval = ProbeHashEntryEval(TT, pos_key, 0, alpha, beta)
+    if tt_score is not None:
+        return tt_score
+
     in_check = board.is_sq_attacked(board.king_sq[board.side], board.side ^ 1)
 
     # Standing pat is only valid if side-to-move is not in check.
+    # The static eval is cached on the entry, so a revisited q-node
+    # skips EvalPosition.
     stand_pat = -INF
+    static_eval = None
     if not in_check:
-        stand_pat = EvalPosition(board)
+        static_eval = tt_eval if tt_eval is not None else EvalPosition(board)
+        stand_pat = static_eval
         if stand_pat >= beta:
+            StoreHashEntry(TT, pos_key, tt_move, beta, TT_BETA, 0, static_eval)
             return beta
         if stand_pat > alpha:
             alpha = stand_pat
 
         # Delta pruning: if even optimistic capture gain cannot reach alpha,
         # skip quiescence expansion at this node.
-        if stand_pat + PieceVal[Pieces.wQ] + DELTA_MARGIN < alpha:
+        if stand_pat + PieceVal[wQ] + DELTA_MARGIN < alpha:
+            StoreHashEntry(TT, pos_key, tt_move, alpha, TT_ALPHA, 0, static_eval)
             return alpha
 
-    move_list = MoveList()
+    move_list = MoveStack[board.ply]
     if in_check:
         # If in check, search legal evasions (all moves), not captures only.
-        GenerateAllMoves(board, move_list)
+        GenerateLegalMoves(board, move_list)
     else:
         GenerateAllCaps(board, move_list)
-    _sort_move_list(move_list)
 
+    # Try the stored best capture first.
+    if tt_move:
+        moves = move_list.moves
+        for i in range(move_list.count):
+            if moves[i] == tt_move:
+                move_list.scores[i] = 2_000_000
+                break
+
+    best_move = 0
     for move_num in range(move_list.count):
-        move = move_list.moves[move_num].move
+        PickNextMove(move_num, move_list)
+        move = move_list.moves[move_num]
 
         # Capture-delta pruning (not while in check):
         # if this capture/promotion can't improve alpha, skip it.
         if not in_check:
             captured = CAPTURED(move)
             promo = PROMOTED(move)
-            if captured == Pieces.EMPTY and promo == Pieces.EMPTY:
+            if captured == EMPTY and promo == EMPTY:
                 continue
             gain = 0
-            if captured != Pieces.EMPTY:
+            if captured != EMPTY:
                 gain += PieceVal[captured]
-            if promo != Pieces.EMPTY:
+            if promo != EMPTY:
                 gain += PieceVal[promo]
             if stand_pat + gain + DELTA_MARGIN < alpha:
                 continue
+            # A capture that loses material by SEE will not raise a quiet
+            # position's score; leave it to the full-width search.
+            if _is_losing_capture(board, move):
+                continue
 
         if not MakeMove(board, move):
             continue
@@ -344,11 +488,17 @@ def Quiescence(alpha, beta, board, info):
             info.fh += 1
             if move_num == 0:
                 info.fhf += 1
+            StoreHashEntry(TT, pos_key, move, beta, TT_BETA, 0, static_eval)
             return beta
 
         if score > alpha:
             alpha = score
+            best_move = move
 
+    if alpha > alpha_orig:
+        StoreHashEntry(TT, pos_key, best_move, alpha, TT_EXACT, 0, static_eval)
+    else:
+        StoreHashEntry(TT, pos_key, best_move, alpha, TT_ALPHA, 0, static_eval)
     return alpha
 
 
@@ -379,7 +529,10 @@ def AlphaBeta(alpha, beta, depth, board, info, do_null=1, ply=0):
 
     alpha_orig = alpha
     tt_score, tt_move = _tt_probe(board.pos_key, depth, alpha, beta)
-    if tt_score is not None:
+    # No cutoff at the root or at PV nodes: with the table kept across
+    # searches, an entry from an earlier search would cut the line short and
+    # leave the PV table without its moves.
+    if tt_score is not None and ply > 0 and beta - alpha == 1:
         return tt_score
 
     # Null Move Pruning: strong speed/strength optimization in quiet nodes.
@@ -401,19 +554,21 @@ def AlphaBeta(alpha, beta, depth, board, info, do_null=1, ply=0):
             _tt_store(board.pos_key, depth, beta, TT_BETA, 0)
             return beta
 
-    move_list = MoveList()
-    GenerateAllMoves(board, move_list)
-
     pv_move = tt_move if tt_move != 0 else ProbePvTable(board)
-    _order_moves(board, move_list, ply, pv_move)
-    _sort_move_list(move_list)
+    if in_check:
+        picker = _evasion_moves(board, MoveStack[ply], ply, pv_move)
+    else:
+        picker = _staged_moves(board, MoveStack[ply], ply, pv_move)
+    if ply == 0 and info.excluded:
+        # MultiPV: lines already reported at this depth are skipped.
+        excluded = info.excluded
+        picker = (move for move in picker if move not in excluded)
 
     legal_moves = 0
     old_alpha = alpha
     best_move = 0
 
-    for move_num in range(move_list.count):
-        move = move_list.moves[move_num].move
+    for move in picker:
         if not MakeMove(board, move):
             continue
 
@@ -476,7 +631,9 @@ def AlphaBeta(alpha, beta, depth, board, info, do_null=1, ply=0):
     if alpha <= alpha_orig:
         tt_flag = TT_ALPHA
 
-    _tt_store(board.pos_key, depth, alpha, tt_flag, best_move)
+    # A root searched without some of its moves must not be stored.
+    if ply or not info.excluded:
+        _tt_store(board.pos_key, depth, alpha, tt_flag, best_move)
 
     if alpha != old_alpha and best_move != 0:
         StorePvMove(board, best_move)
@@ -490,11 +647,11 @@ def FindBestMoveMinMax(board, depth):
 
     best_move = 0
     legal_moves = 0
-    maximizing = board.side == Side.WHITE
+    maximizing = board.side == WHITE
     best_score = -INF if maximizing else INF
 
     for i in range(move_list.count):
-        move = move_list.moves[i].move
+        move = move_list.moves[i]
         if not MakeMove(board, move):
             continue
         legal_moves += 1
@@ -528,7 +685,7 @@ def FindBestMoveNegaMaxWithStats(board, depth):
     legal_moves = 0
 
     for i in range(move_list.count):
-        move = move_list.moves[i].move
+        move = move_list.moves[i]
         if not MakeMove(board, move):
             continue
         legal_moves += 1
@@ -556,12 +713,8 @@ def FindBestMoveAlphaBeta(board, depth):
     best_move = board.pv_array[0] if pv_count > 0 else 0
 
     move_list = MoveList()
-    GenerateAllMoves(board, move_list)
-    legal_root_moves = 0
-    for i in range(move_list.count):
-        if MakeMove(board, move_list.moves[i].move):
-            legal_root_moves += 1
-            TakeMove(board)
+    GenerateLegalMoves(board, move_list)
+    legal_root_moves = move_list.count
 
     stats = {
         "nodes": info.nodes,
@@ -573,62 +726,408 @@ def FindBestMoveAlphaBeta(board, depth):
     return best_move, move_str, score, legal_root_moves, stats
 
 
-def IterativeDeepening(board, max_depth, time_limit_ms=0, stdin_enabled=True, verbose=True):
+def _search_root(board, info, depth, prev_score, full_window):
+    # Full window on the first iteration, then a widening aspiration window.
+    if full_window:
+        return AlphaBeta(-INF, INF, depth, board, info, 1, 0)
+
+    window = 50
+    alpha = max(-INF, prev_score - window)
+    beta = min(INF, prev_score + window)
+    score = AlphaBeta(alpha, beta, depth, board, info, 1, 0)
+    while not info.stopped and (score <= alpha or score >= beta):
+        window *= 2
+        alpha = max(-INF, prev_score - window)
+        beta = min(INF, prev_score + window)
+        score = AlphaBeta(alpha, beta, depth, board, info, 1, 0)
+    return score
+
+
+def _search_multipv(board, info, depth, prev_score, full_window):
+    """
+    Searches the root once per MultiPV line, each time without the moves of
+    the lines before it. Returns [(score, pv_moves), ...], best line first;
+    a stopped search returns whatever lines completed.
+    """
+    move_list = MoveList()
+    GenerateLegalMoves(board, move_list)
+    num_lines = min(info.multi_pv, move_list.count)
+
+    lines = []
+    for line in range(num_lines):
+        info.excluded = tuple(pv[0] for _, pv in lines)
+        if line == 0:
+            score = _search_root(board, info, depth, prev_score, full_window)
+        else:
+            score = AlphaBeta(-INF, INF, depth, board, info, 1, 0)
+        if info.stopped:
+            break
+        pv_count = GetPvLine(depth, board)
+        if pv_count == 0:
+            break
+        lines.append((score, [board.pv_array[i] for i in range(pv_count)]))
+    info.excluded = ()
+
+    # Later lines can still score above earlier ones (TT hits, aspiration),
+    # so rank them before the best one is picked.
+    lines.sort(key=lambda line: line[0], reverse=True)
+
+    # The root PV entry belongs to the best line for the next iteration.
+    if lines:
+        StorePvMove(board, lines[0][1][0])
+    return lines
+
+
+def _deepen(board, info, max_depth, start_depth=1, on_iteration=None):
+    """
+    Iterative deepening loop shared by every search driver.
+    Returns the last fully completed iteration; on_iteration(depth, score, pv)
+    is called after each one (for printing). With info.multi_pv > 1 it is
+    called once per line, with multipv=<line number> as a keyword.
+    """
+    best = {"best_move": 0, "best_score": -INF, "pv": [], "completed_depth": 0}
+
+    for depth in range(start_depth, max_depth + 1):
+        if info.multi_pv > 1:
+            lines = _search_multipv(board, info, depth, best["best_score"], depth == start_depth)
+            if info.stopped or not lines:
+                break
+            score, pv_moves = lines[0]
+        else:
+            score = _search_root(board, info, depth, best["best_score"], depth == start_depth)
+            if info.stopped:
+                break
+
+            pv_count = GetPvLine(depth, board)
+            pv_moves = [board.pv_array[i] for i in range(pv_count)]
+            lines = None
+        if pv_moves:
+            best["best_move"] = pv_moves[0]
+        best["pv"] = pv_moves
+        best["best_score"] = score
+        best["completed_depth"] = depth
+
+        if on_iteration is not None:
+            if lines is None:
+                on_iteration(depth, score, pv_moves)
+            else:
+                for line, (line_score, line_pv) in enumerate(lines, 1):
+                    on_iteration(depth, line_score, line_pv, multipv=line)
+
+    return best
+
+
+# --- Lazy SMP ---
+# Helper processes search the same root on one shared transposition table.
+# Nothing else is shared: each helper has its own board, PV table, killers and
+# history, and they drift apart through TT hits and staggered start depths.
+# The main process searches too, then keeps the deepest completed iteration.
+
+SMP_RESULT_TIMEOUT_S = 5
+
+
+def _lazy_smp_worker(worker_id, board, max_depth, shm_name, num_buckets, age, stop_event, results):
+    global TT
+
+    AllInit()
+    TT = HashTable()
+    AttachSharedHashTable(TT, shm_name, num_buckets, age)
+
+    info = SearchInfo()
+    info.stdin_enabled = 0
+    info.stop_event = stop_event
+    # The main process already started this generation.
+    ClearForSearch(board, info, age_hash=False)
+
+    # Odd helpers skip a depth so the processes are not all on the same iteration.
+    best = _deepen(board, info, max_depth, start_depth=1 + (worker_id & 1))
+    best["nodes"] = info.nodes
+    results.put((worker_id, best))
+    CloseSharedHashTable(TT)
+
+
+def _start_lazy_smp(board, max_depth, threads):
+    global TT
+    import multiprocessing
+
+    # Seed the shared table with what the local one has learned so far;
+    # _finish_lazy_smp copies it back so the next search starts warm.
+    shared = HashTable()
+    InitSharedHashTable(shared, TT_SIZE_MB)
+    local_tt = TT
+    _copy_hash_table(local_tt, shared)
+    TT = shared
+
+    ctx = multiprocessing.get_context()
+    stop_event = ctx.Event()
+    results = ctx.Queue()
+    helpers = []
+    for worker_id in range(1, threads):
+        helper = ctx.Process(
+            target=_lazy_smp_worker,
+            args=(
+                worker_id,
+                board.copy(),
+                max_depth,
+                shared.shm.name,
+                shared.num_buckets,
+                shared.age,
+                stop_event,
+                results,
+            ),
+            daemon=True,
+        )
+        helper.start()
+        helpers.append(helper)
+    return helpers, stop_event, results, local_tt
+
+
+def _finish_lazy_smp(smp):
+    # Stop the helpers and collect their last completed iterations.
+    global TT
+    import queue
+
+    helpers, stop_event, results, local_tt = smp
+    stop_event.set()
+
+    found = []
+    for _ in helpers:
+        try:
+            found.append(results.get(timeout=SMP_RESULT_TIMEOUT_S)[1])
+        except queue.Empty:
+            break
+    for helper in helpers:
+        helper.join(timeout=1)
+        if helper.is_alive():
+            helper.terminate()
+
+    _copy_hash_table(TT, local_tt)
+    CloseSharedHashTable(TT)
+    TT = local_tt
+    return found
+
+
+def _copy_hash_table(src, dst):
+    if src.num_entries != dst.num_entries:
+        return
+    memoryview(dst.keys)[:] = src.keys
+    memoryview(dst.data)[:] = src.data
+    memoryview(dst.evals)[:] = src.evals
+    dst.age = src.age
+
+
+def _search_with_helpers(board, info, max_depth, threads, on_iteration=None):
+    threads = max(1, int(threads))
+    if threads == 1:
+        best = _deepen(board, info, max_depth, on_iteration=on_iteration)
+        best["nodes"] = info.nodes
+        return best
+
+    smp = _start_lazy_smp(board, max_depth, threads)
+    try:
+        best = _deepen(board, info, max_depth, on_iteration=on_iteration)
+    finally:
+        helper_results = _finish_lazy_smp(smp)
+
+    best["nodes"] = info.nodes
+    for result in helper_results:
+        best["nodes"] += result["nodes"]
+        if result["completed_depth"] > best["completed_depth"] and result["best_move"] != 0:
+            best["best_move"] = result["best_move"]
+            best["best_score"] = result["best_score"]
+            best["pv"] = result["pv"]
+            best["completed_depth"] = result["completed_depth"]
+    return best
+
+
+# --- Root splitting ---
+# A simpler alternative to Lazy SMP for the analysis menus: the root moves are
+# shared out over a process pool and each one is searched to depth - 1 from
+# its own copy of the root board. Board.copy keeps the game history and
+# rep_keys, so workers see the same repetition draws as a single-process
+# search (a FEN alone would lose them). The first move is searched locally
+# with a full window (young brothers wait), then the rest go out in batches of
+# one move per worker, each behind a null window at the best score so far.
+# Every task starts from a cleared table and a batch only narrows the window
+# once it is complete, so the result depends on the worker count alone.
+
+
+ROOT_SPLIT_TT_MB = 2
+
+
+def _root_split_init():
+    # Every task clears its table, so workers keep a small one.
+    AllInit()
+    InitHashTable(TT, ROOT_SPLIT_TT_MB)
+
+
+def _root_split_task(root, move, depth, alpha, time_left_ms):
+    # root is a pickled Board.copy(), private to this task.
+    board = root
+    info = SearchInfo()
+    info.stdin_enabled = 0
+    ClearForSearch(board, info, clear_hash=True)
+    if time_left_ms > 0:
+        info.time_set = 1
+        info.stop_time = info.start_time + time_left_ms
+
+    if not MakeMove(board, move):
+        return None
+    score = -AlphaBeta(-alpha - 1, -alpha, depth, board, info, 1, 1)
+    if score > alpha and not info.stopped:
+        score = -AlphaBeta(-INF, -alpha, depth, board, info, 1, 1)
+    pv_count = GetPvLine(depth, board)
+    pv = [move] + [board.pv_array[i] for i in range(pv_count)]
+    return score, pv, info.nodes, info.stopped
+
+
+def _root_split_iteration(pool, board, info, root, root_moves, depth, workers):
+    # Eldest brother first, on the main board with the full window.
+    # Moves MakeMove rejects are skipped, as in AlphaBeta.
+    for index, first in enumerate(root_moves):
+        if MakeMove(board, first):
+            break
+    else:
+        return None
+    score = -AlphaBeta(-INF, INF, depth - 1, board, info, 1, 1)
+    # GetPvLine unwinds to ply 0, which also takes back the root move.
+    pv_count = GetPvLine(depth - 1, board)
+    if info.stopped:
+        return None
+
+    best_score = score
+    best_pv = [first] + [board.pv_array[i] for i in range(pv_count)]
+    scores = {first: score}
+
+    rest = root_moves[index + 1:]
+    for start in range(0, len(rest), workers):
+        batch = rest[start : start + workers]
+        time_left_ms = 0
+        if info.time_set:
+            time_left_ms = info.stop_time - GetTimeMs()
+            if time_left_ms <= 0:
+                info.stopped = 1
+                return None
+        futures = [
+            pool.submit(_root_split_task, root, move, depth - 1, best_score, time_left_ms)
+            for move in batch
+        ]
+        # Combine in root-move order, never in completion order.
+        results = [future.result() for future in futures]
+        for move, result in zip(batch, results):
+            if result is None:
+                continue
+            score, pv, nodes, stopped = result
+            info.nodes += nodes
+            if stopped:
+                info.stopped = 1
+                return None
+            scores[move] = score
+            if score > best_score:
+                best_score = score
+                best_pv = pv
+
+    return best_score, best_pv, scores
+
+
+def RootSplitSearch(board, max_depth, workers, time_limit_ms=0, verbose=True):
+    """
+    Iterative deepening with the root moves split over a ProcessPoolExecutor.
+    Returns the same dict as IterativeDeepening.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    info = SearchInfo()
+    info.start_time = GetTimeMs()
+    info.stop_time = info.start_time + time_limit_ms if time_limit_ms > 0 else 0
+    info.time_set = 1 if time_limit_ms > 0 else 0
+    info.stdin_enabled = 0
+    # Root splitting stays deterministic across worker counts, so it never
+    # reuses entries from earlier searches.
+    ClearForSearch(board, info, clear_hash=True)
+
+    root = board.copy()
+    # Legal root moves only: _staged_moves assumes the root is not in check.
+    in_check = board.is_sq_attacked(board.king_sq[board.side], board.side ^ 1)
+    if in_check:
+        root_moves = list(_evasion_moves(board, MoveList(), 0, 0))
+    else:
+        root_moves = list(_staged_moves(board, MoveList(), 0, 0))
+    best = {"best_move": 0, "best_score": -INF, "pv": [], "completed_depth": 0}
+    if not root_moves:
+        # No legal move: report the mate or stalemate score, as AlphaBeta would.
+        best["best_score"] = -MATE if in_check else 0
+
+    if root_moves:
+        with ProcessPoolExecutor(max_workers=max(1, int(workers)), initializer=_root_split_init) as pool:
+            for depth in range(1, max_depth + 1):
+                found = _root_split_iteration(pool, board, info, root, root_moves, depth, workers)
+                if found is None:
+                    break
+                score, pv, scores = found
+                best["best_move"] = pv[0]
+                best["best_score"] = score
+                best["pv"] = pv
+                best["completed_depth"] = depth
+
+                # Next iteration tries the moves best-first (stable on ties).
+                root_moves.sort(key=lambda move: -scores.get(move, -INF))
+                if verbose:
+                    pv_str = " ".join(PrMove(m) for m in pv)
+                    SendLine(f"Depth {depth}: score={score} nodes={info.nodes} pv={pv_str}")
+
+    best_move = best["best_move"]
+    return {
+        "best_move": best_move,
+        "best_move_str": PrMove(best_move) if best_move != 0 else "(none)",
+        "best_score": best["best_score"],
+        "completed_depth": best["completed_depth"],
+        "nodes": info.nodes,
+        "cutoffs": info.fh,
+        "first_cutoffs": info.fhf,
+        "eval_hits": EvalHash.hits,
+        "eval_misses": EvalHash.misses,
+        "stopped": info.stopped,
+        "quit": info.quit,
+        "pv": [PrMove(m) for m in best["pv"]],
+    }
+
+
+def IterativeDeepening(
+    board, max_depth, time_limit_ms=0, stdin_enabled=True, verbose=True, threads=1, stop_event=None
+):
     info = SearchInfo()
     info.start_time = GetTimeMs()
     info.stop_time = info.start_time + time_limit_ms if time_limit_ms > 0 else 0
     info.time_set = 1 if time_limit_ms > 0 else 0
     info.stdin_enabled = 1 if stdin_enabled else 0
+    info.stop_event = stop_event
     ClearForSearch(board, info)
 
-    best_move = 0
-    best_score = -INF
-    best_pv = []
-    completed_depth = 0
-
-    for depth in range(1, max_depth + 1):
-        if depth == 1:
-            score = AlphaBeta(-INF, INF, depth, board, info, 1, 0)
-        else:
-            window = 50
-            alpha = max(-INF, best_score - window)
-            beta = min(INF, best_score + window)
-            score = AlphaBeta(alpha, beta, depth, board, info, 1, 0)
-            while not info.stopped and (score <= alpha or score >= beta):
-                window *= 2
-                alpha = max(-INF, best_score - window)
-                beta = min(INF, best_score + window)
-                score = AlphaBeta(alpha, beta, depth, board, info, 1, 0)
-        if info.stopped:
-            break
+    def report(depth, score, pv_moves):
+        pv_str = " ".join(PrMove(m) for m in pv_moves)
+        SendLine(
+            f"Depth {depth}: score={score} nodes={info.nodes} "
+            f"cutoffs={info.fh} pv={pv_str}"
+        )
 
-        pv_count = GetPvLine(depth, board)
-        pv_moves = [board.pv_array[i] for i in range(pv_count)]
-        if pv_count > 0:
-            best_move = board.pv_array[0]
-            best_pv = pv_moves
-        best_score = score
-        completed_depth = depth
-
-        if verbose:
-            pv_str = " ".join(PrMove(m) for m in pv_moves)
-            print(
-                f"Depth {depth}: score={score} nodes={info.nodes} "
-                f"cutoffs={info.fh} pv={pv_str}"
-            )
+    best = _search_with_helpers(board, info, max_depth, threads, report if verbose else None)
 
+    best_move = best["best_move"]
     best_move_str = PrMove(best_move) if best_move != 0 else "(none)"
     result = {
         "best_move": best_move,
         "best_move_str": best_move_str,
-        "best_score": best_score,
-        "completed_depth": completed_depth,
-        "nodes": info.nodes,
+        "best_score": best["best_score"],
+        "completed_depth": best["completed_depth"],
+        "nodes": best["nodes"],
         "cutoffs": info.fh,
         "first_cutoffs": info.fhf,
+        "eval_hits": EvalHash.hits,
+        "eval_misses": EvalHash.misses,
         "stopped": info.stopped,
         "quit": info.quit,
-        "pv": [PrMove(m) for m in best_pv],
+        "pv": [PrMove(m) for m in best["pv"]],
     }
     return result
 
@@ -640,51 +1139,37 @@ def SearchPosition(board, info):
     max_depth = info.depth if info.depth > 0 else 1
     ClearForSearch(board, info)
 
-    best_move = 0
-    best_score = -INF
-    best_pv = []
-
-    for current_depth in range(1, max_depth + 1):
-        if current_depth == 1:
-            best_score = AlphaBeta(-INF, INF, current_depth, board, info, 1, 0)
-        else:
-            window = 50
-            alpha = max(-INF, best_score - window)
-            beta = min(INF, best_score + window)
-            best_score = AlphaBeta(alpha, beta, current_depth, board, info, 1, 0)
-            while not info.stopped and (best_score <= alpha or best_score >= beta):
-                window *= 2
-                alpha = max(-INF, best_score - window)
-                beta = min(INF, best_score + window)
-                best_score = AlphaBeta(alpha, beta, current_depth, board, info, 1, 0)
-        if info.stopped:
-            break
-
-        pv_count = GetPvLine(current_depth, board)
-        if pv_count > 0:
-            best_move = board.pv_array[0]
-            best_pv = [board.pv_array[i] for i in range(pv_count)]
-        else:
-            best_pv = []
-
+    def report(depth, score, pv_moves, multipv=0):
         elapsed_ms = GetTimeMs() - info.start_time
-        pv_str = " ".join(PrMove(board.pv_array[i]) for i in range(pv_count))
-        print(
-            f"info score cp {best_score} depth {current_depth} "
+        pv_str = " ".join(PrMove(m) for m in pv_moves)
+        line = f"multipv {multipv} " if multipv else ""
+        SendLine(
+            f"info {line}score cp {score} depth {depth} "
             f"nodes {info.nodes} time {elapsed_ms} pv {pv_str}".rstrip()
         )
 
+    best = _search_with_helpers(board, info, max_depth, info.threads, report)
+
+    WaitWhilePondering(info)
+
     ordering = (info.fhf / info.fh) * 100.0 if info.fh > 0 else 0.0
+    best_move = best["best_move"]
     best_move_str = PrMove(best_move) if best_move != 0 else "0000"
-    print(f"bestmove {best_move_str}")
+    # The PV's reply is what the GUI should ponder on.
+    if best_move != 0 and len(best["pv"]) > 1:
+        SendLine(f"bestmove {best_move_str} ponder {PrMove(best['pv'][1])}")
+    else:
+        SendLine(f"bestmove {best_move_str}")
 
     return {
         "best_move": best_move,
         "best_move_str": best_move_str,
-        "best_score": best_score,
-        "nodes": info.nodes,
+        "best_score": best["best_score"],
+        "nodes": best["nodes"],
         "fh": info.fh,
         "fhf": info.fhf,
         "ordering": ordering,
-        "pv": [PrMove(m) for m in best_pv],
+        "eval_hits": EvalHash.hits,
+        "eval_misses": EvalHash.misses,
+        "pv": [PrMove(m) for m in best["pv"]],
     }
@@ -0,0 +1,265 @@
+from array import array
+
+NOMOVE = 0
+DEFAULT_HASH_SIZE_MB = 16
+
+TT_EXACT = 0
+TT_ALPHA = 1
+TT_BETA = 2
+
+# Packed entry layout, one slot per index across three parallel arrays:
+#   data  = move (25 bits) | score (16) | depth (8) | flag (2) | age (8)
+#   evals = static eval + EVAL_OFFSET, or 0 when the slot holds no eval (U32)
+#   keys  = pos_key ^ data ^ evals
+# A probe only trusts a slot when keys ^ data ^ evals gives back the position
+# key, so a slot half-written by another process reads as a miss instead of
+# garbage. data has only 5 bits to spare, hence the separate eval word.
+HASH_ENTRY_BYTES = 8 + 8 + 4
+
+MOVE_BITS = 25
+SCORE_SHIFT = 25
+DEPTH_SHIFT = 41
+FLAG_SHIFT = 49
+AGE_SHIFT = 51
+
+SCORE_OFFSET = 1 << 15
+DEPTH_OFFSET = 1 << 7
+EVAL_OFFSET = 1 << 31
+
+# Each bucket holds two slots:
+#   slot 0 -> depth-preferred (kept unless stale or shallower)
+#   slot 1 -> always-replace (catches everything slot 0 refuses)
+HASH_BUCKET_SLOTS = 2
+
+
+class HashTable:
+    __slots__ = (
+        "keys",
+        "data",
+        "evals",
+        "num_entries",
+        "num_buckets",
+        "age",
+        "shm",
+        "shm_owner",
+    )
+
+    def __init__(self):
+        self.keys = array("Q")
+        self.data = array("Q")
+        self.evals = array("I")
+        self.num_entries = 0
+        self.num_buckets = 0
+        self.age = 0
+        self.shm = None
+        self.shm_owner = False
+
+
+def _buckets_for_size(size_mb):
+    size_bytes = int(size_mb * 1024 * 1024)
+    num_buckets = size_bytes // (HASH_ENTRY_BYTES * HASH_BUCKET_SLOTS)
+    return max(1, num_buckets)
+
+
+def InitHashTable(table, size_mb=DEFAULT_HASH_SIZE_MB):
+    """
+    Preallocate the transposition table from a size in MB.
+    Entries live in flat typed arrays so a store never allocates.
+    """
+    CloseSharedHashTable(table)
+    num_buckets = _buckets_for_size(size_mb)
+    num_entries = num_buckets * HASH_BUCKET_SLOTS
+    table.num_buckets = num_buckets
+    table.num_entries = num_entries
+    table.keys = array("Q", bytes(8 * num_entries))
+    table.data = array("Q", bytes(8 * num_entries))
+    table.evals = array("I", bytes(4 * num_entries))
+    table.age = 0
+
+
+def _map_shared(table, shm, num_buckets):
+    num_entries = num_buckets * HASH_BUCKET_SLOTS
+    buf = shm.buf
+    table.keys = buf[: 8 * num_entries].cast("Q")
+    table.data = buf[8 * num_entries : 16 * num_entries].cast("Q")
+    table.evals = buf[16 * num_entries : 20 * num_entries].cast("I")
+    table.num_buckets = num_buckets
+    table.num_entries = num_entries
+    table.shm = shm
+
+
+def InitSharedHashTable(table, size_mb=DEFAULT_HASH_SIZE_MB):
+    """
+    Like InitHashTable, but the entries live in a multiprocessing.shared_memory
+    block that other processes can attach to by name (Lazy SMP helpers).
+    """
+    from multiprocessing import shared_memory
+
+    CloseSharedHashTable(table)
+    num_buckets = _buckets_for_size(size_mb)
+    size = HASH_ENTRY_BYTES * HASH_BUCKET_SLOTS * num_buckets
+    shm = shared_memory.SharedMemory(create=True, size=size)
+    _map_shared(table, shm, num_buckets)
+    table.shm_owner = True
+    table.age = 0
+    ClearHashTable(table)
+
+
+def AttachSharedHashTable(table, name, num_buckets, age=0):
+    from multiprocessing import shared_memory
+
+    CloseSharedHashTable(table)
+    shm = shared_memory.SharedMemory(name=name)
+    _map_shared(table, shm, num_buckets)
+    table.shm_owner = False
+    table.age = age
+
+
+def CloseSharedHashTable(table):
+    # Views into the block must be released before it can be closed.
+    if table.shm is None:
+        return
+    table.keys.release()
+    table.data.release()
+    table.evals.release()
+    table.keys = array("Q")
+    table.data = array("Q")
+    table.evals = array("I")
+    table.num_entries = 0
+    table.num_buckets = 0
+    table.shm.close()
+    if table.shm_owner:
+        table.shm.unlink()
+    table.shm = None
+    table.shm_owner = False
+
+
+def ClearHashTable(table):
+    n = table.num_entries
+    table.keys[:] = array("Q", bytes(8 * n))
+    table.data[:] = array("Q", bytes(8 * n))
+    table.evals[:] = array("I", bytes(4 * n))
+    table.age = 0
+
+
+def AgeHashTable(table):
+    """Start a new search generation; older entries become preferred victims."""
+    table.age = (table.age + 1) & 0xFF
+
+
+def _pack_entry(move, score, flag, depth, age):
+    return (
+        (move & ((1 << MOVE_BITS) - 1))
+        | ((score + SCORE_OFFSET) << SCORE_SHIFT)
+        | ((depth + DEPTH_OFFSET) << DEPTH_SHIFT)
+        | (flag << FLAG_SHIFT)
+        | (age << AGE_SHIFT)
+    )
+
+
+def ProbeHashMove(table, pos_key):
+    index = (pos_key % table.num_buckets) * HASH_BUCKET_SLOTS
+    keys = table.keys
+    data = table.data
+    evals = table.evals
+    entry = data[index]
+    if keys[index] ^ entry ^ evals[index] == pos_key:
+        return entry & ((1 << MOVE_BITS) - 1)
+    entry = data[index + 1]
+    if keys[index + 1] ^ entry ^ evals[index + 1] == pos_key:
+        return entry & ((1 << MOVE_BITS) - 1)
+    return NOMOVE
+
+
+def ProbeHashEntry(table, pos_key, depth, alpha, beta):
+    """
+    Returns (score, move). score is None unless the stored bound
+    is deep enough and resolves the (alpha, beta) window.
+    """
+    score, move, _ = ProbeHashEntryEval(table, pos_key, depth, alpha, beta)
+    return score, move
+
+
+def ProbeHashEntryEval(table, pos_key, depth, alpha, beta):
+    """
+    ProbeHashEntry plus the cached static eval: returns (score, move, eval),
+    eval being None when the position is missing or was stored without one.
+    """
+    index = (pos_key % table.num_buckets) * HASH_BUCKET_SLOTS
+    keys = table.keys
+    data = table.data
+    evals = table.evals
+    entry = data[index]
+    eval_word = evals[index]
+    if keys[index] ^ entry ^ eval_word != pos_key:
+        index += 1
+        entry = data[index]
+        eval_word = evals[index]
+        if keys[index] ^ entry ^ eval_word != pos_key:
+            return None, NOMOVE, None
+
+    static_eval = eval_word - EVAL_OFFSET if eval_word else None
+    move = entry & ((1 << MOVE_BITS) - 1)
+    if ((entry >> DEPTH_SHIFT) & 0xFF) - DEPTH_OFFSET < depth:
+        return None, move, static_eval
+
+    score = ((entry >> SCORE_SHIFT) & 0xFFFF) - SCORE_OFFSET
+    flag = (entry >> FLAG_SHIFT) & 0x3
+    if flag == TT_EXACT:
+        return score, move, static_eval
+    if flag == TT_ALPHA and score <= alpha:
+        return score, move, static_eval
+    if flag == TT_BETA and score >= beta:
+        return score, move, static_eval
+    return None, move, static_eval
+
+
+def StoreHashEntry(table, pos_key, move, score, flag, depth, static_eval=None):
+    index = (pos_key % table.num_buckets) * HASH_BUCKET_SLOTS
+    keys = table.keys
+    data = table.data
+    evals = table.evals
+    age = table.age
+
+    # Depth-preferred slot: take it when it's the same position, stale,
+    # or no deeper than what we are storing now. Otherwise fall through
+    # to the always-replace slot.
+    entry = data[index]
+    eval_word = evals[index]
+    same = keys[index] ^ entry ^ eval_word == pos_key
+    if not (
+        same
+        or (entry >> AGE_SHIFT) != age
+        or ((entry >> DEPTH_SHIFT) & 0xFF) - DEPTH_OFFSET <= depth
+    ):
+        index += 1
+        entry = data[index]
+        eval_word = evals[index]
+        same = keys[index] ^ entry ^ eval_word == pos_key
+
+    if same:
+        stored_move = entry & ((1 << MOVE_BITS) - 1)
+        # A shallower store (e.g. a depth-0 q-node) must not downgrade a
+        # deeper entry of this generation: keep its bound, only fill in a
+        # missing move or eval.
+        if (entry >> AGE_SHIFT) == age and ((entry >> DEPTH_SHIFT) & 0xFF) - DEPTH_OFFSET > depth:
+            if stored_move == NOMOVE and move != NOMOVE:
+                entry = (entry & ~((1 << MOVE_BITS) - 1)) | (move & ((1 << MOVE_BITS) - 1))
+            if eval_word == 0 and static_eval is not None:
+                eval_word = static_eval + EVAL_OFFSET
+            data[index] = entry
+            evals[index] = eval_word
+            keys[index] = pos_key ^ entry ^ eval_word
+            return
+        # Keep a known best move / static eval when re-storing without one.
+        if move == NOMOVE:
+            move = stored_move
+    else:
+        eval_word = 0
+    if static_eval is not None:
+        eval_word = static_eval + EVAL_OFFSET
+
+    entry = _pack_entry(move, score, flag, depth, age)
+    data[index] = entry
+    evals[index] = eval_word
+    keys[index] = pos_key ^ entry ^ eval_word
@@ -1,61 +1,111 @@
+import queue
 import sys
+import threading
+from collections import deque
 
-from defs import AllInit, Board, ENGINE_NAME, MAXDEPTH, SearchInfo, Side
+from defs import AllInit, Board, ENGINE_NAME, MAXDEPTH, MOVE_OVERHEAD_MS, SearchInfo, Side
 from book import get_book_move, load_opening_book
-from misc import GetTimeMs
+from misc import GetTimeMs, SendLine
 from move_io import NOMOVE, ParseMove, PrMove
-from make_mov import MakeMove
-from search import SearchPosition
+from make_mov import MakeMove, TakeMove
+from search import (
+    SearchPosition,
+    ClearForNewGame,
+    PonderHit,
+    WaitWhilePondering,
+    ResizeSearchTables,
+    TT_SIZE_MB,
+)
+from pvtable import DEFAULT_PV_SIZE_MB
+from evaluate import DEFAULT_EVAL_HASH_SIZE_MB, DEFAULT_PAWN_HASH_SIZE_MB
+from bench import Bench, ParseBenchDepth
 
 
 INITIAL_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+MAX_THREADS = 64
+MAX_HASH_MB = 4096
+MAX_MULTI_PV = 64
+MAX_MOVE_OVERHEAD_MS = 5000
+OWN_BOOK = True
+
+# Queued by the search thread when it has printed its bestmove.
+SEARCH_DONE = object()
+
+
+# The last position command applied, as (board, base tokens, moves applied,
+# resulting pos_key). A command with the same base that extends (or shares a
+# prefix with) those moves only takes back / makes the moves that differ, so
+# "position startpos moves ..." costs O(new moves) instead of the whole game.
+_last_position = None
+
+
+def _set_position_base(base, board):
+    # Default fallback keeps behavior safe if command is malformed.
+    board.parse_fen(INITIAL_FEN)
+    if base and base[0] == "fen":
+        fen = " ".join(base[1:])
+        if fen:
+            board.parse_fen(fen)
 
 
 def ParsePosition(line, board):
+    global _last_position
     tokens = line.strip().split()
     if not tokens or tokens[0] != "position":
         return
 
-    # Default fallback keeps behavior safe if command is malformed.
-    board.parse_fen(INITIAL_FEN)
+    if "moves" in tokens:
+        moves_at = tokens.index("moves")
+        base = tokens[1:moves_at]
+        moves = tokens[moves_at + 1:]
+    else:
+        base = tokens[1:]
+        moves = []
+
+    last = _last_position
+    if last is not None and last[0] is board and last[1] == base and last[3] == board.pos_key:
+        applied = last[2]
+        common = 0
+        limit = min(len(applied), len(moves))
+        while common < limit and applied[common] == moves[common]:
+            common += 1
+        for _ in range(len(applied) - common):
+            TakeMove(board)
+        applied = applied[:common]
+    else:
+        _set_position_base(base, board)
+        applied = []
+    # Search should always begin from root in this current position.
+    board.ply = 0
+
+    for token in moves[len(applied):]:
+        move = ParseMove(token, board)
+        if move == NOMOVE:
+            break
+        if not MakeMove(board, move):
+            break
+        board.ply = 0
+        applied.append(token)
 
-    idx = 1
-    if idx < len(tokens) and tokens[idx] == "startpos":
-        idx += 1
-    elif idx < len(tokens) and tokens[idx] == "fen":
-        idx += 1
-        if idx < len(tokens):
-            if "moves" in tokens[idx:]:
-                moves_at = tokens.index("moves", idx)
-                fen = " ".join(tokens[idx:moves_at])
-                idx = moves_at
-            else:
-                fen = " ".join(tokens[idx:])
-                idx = len(tokens)
-            if fen:
-                board.parse_fen(fen)
-
-    if idx < len(tokens) and tokens[idx] == "moves":
-        idx += 1
-        while idx < len(tokens):
-            move = ParseMove(tokens[idx], board)
-            if move == NOMOVE:
-                break
-            if not MakeMove(board, move):
-                break
-            # Search should always begin from root in this current position.
-            board.ply = 0
-            idx += 1
+    _last_position = (board, base, applied, board.pos_key)
 
 
 def ParseGo(line, info, board):
-    book_move = get_book_move(board)
+    tokens = line.strip().split()
+    info.ponder = 1 if "ponder" in tokens[1:] else 0
+    info.ponder_time = 0
+
+    book_move = get_book_move(board) if OWN_BOOK else NOMOVE
     if book_move != NOMOVE:
-        print(f"bestmove {PrMove(book_move)}")
+        # Drop the clock left over from the last search, or CheckUp would
+        # end the ponder wait at once.
+        info.time_set = 0
+        info.stop_time = 0
+        info.stopped = 0
+        WaitWhilePondering(info)
+        _send(f"bestmove {PrMove(book_move)}")
         return {"best_move": book_move, "book": True}
 
-    tokens = line.strip().split()
-
     depth = -1
     movetime = -1
     wtime = -1
@@ -124,17 +174,87 @@ def ParseGo(line, info, board):
 
     if not infinite and time_left != -1:
         alloc = time_left // movestogo
-        alloc -= 50  # Safety margin for GUI/IO lag.
+        alloc -= info.move_overhead  # Safety margin for GUI/IO lag.
         if alloc < 1:
             alloc = 1
         info.time_set = 1
         info.stop_time = info.start_time + alloc + inc
 
+    # Pondering runs off the clock; ponderhit starts the allocation.
+    if info.ponder and info.time_set:
+        info.ponder_time = info.stop_time - info.start_time
+        info.time_set = 0
+        info.stop_time = 0
+
     return SearchPosition(board, info)
 
 
+def _spin(value, low, high):
+    # UCI spin value clamped to [low, high]; None if it is not a number.
+    try:
+        return max(low, min(high, int(value)))
+    except ValueError:
+        return None
+
+
+def ParseSetOption(line, info, board):
+    # setoption name <id> [value <x>]
+    global OWN_BOOK
+    tokens = line.strip().split()
+    if "name" not in tokens:
+        return
+    name_at = tokens.index("name") + 1
+    if "value" in tokens[name_at:]:
+        value_at = tokens.index("value", name_at)
+        name = " ".join(tokens[name_at:value_at])
+        value = " ".join(tokens[value_at + 1:])
+    else:
+        name = " ".join(tokens[name_at:])
+        value = ""
+
+    name = name.lower()
+    if name == "threads":
+        threads = _spin(value, 1, MAX_THREADS)
+        if threads is not None:
+            info.threads = threads
+    elif name == "multipv":
+        multi_pv = _spin(value, 1, MAX_MULTI_PV)
+        if multi_pv is not None:
+            info.multi_pv = multi_pv
+    elif name == "move overhead":
+        overhead = _spin(value, 0, MAX_MOVE_OVERHEAD_MS)
+        if overhead is not None:
+            info.move_overhead = overhead
+    elif name == "ownbook":
+        OWN_BOOK = value.lower() == "true"
+    elif name in ("hash", "pv hash", "eval hash", "pawn hash"):
+        size_mb = _spin(value, 1, MAX_HASH_MB)
+        if size_mb is None:
+            return
+        if name == "hash":
+            ResizeSearchTables(board, hash_mb=size_mb)
+        elif name == "pv hash":
+            ResizeSearchTables(board, pv_mb=size_mb)
+        elif name == "eval hash":
+            ResizeSearchTables(board, eval_mb=size_mb)
+        else:
+            ResizeSearchTables(board, pawn_mb=size_mb)
+
+
 def _send(line):
-    print(line, flush=True)
+    SendLine(line)
+
+
+def _send_options():
+    _send(f"option name Hash type spin default {TT_SIZE_MB} min 1 max {MAX_HASH_MB}")
+    _send(f"option name PV Hash type spin default {DEFAULT_PV_SIZE_MB} min 1 max {MAX_HASH_MB}")
+    _send(f"option name Eval Hash type spin default {DEFAULT_EVAL_HASH_SIZE_MB} min 1 max {MAX_HASH_MB}")
+    _send(f"option name Pawn Hash type spin default {DEFAULT_PAWN_HASH_SIZE_MB} min 1 max {MAX_HASH_MB}")
+    _send(f"option name Threads type spin default 1 min 1 max {MAX_THREADS}")
+    _send(f"option name MultiPV type spin default 1 min 1 max {MAX_MULTI_PV}")
+    _send(f"option name Move Overhead type spin default {MOVE_OVERHEAD_MS} min 0 max {MAX_MOVE_OVERHEAD_MS}")
+    _send("option name OwnBook type check default true")
+    _send("option name Ponder type check default false")
 
 
 def _configure_stdio():
@@ -160,10 +280,15 @@ def _dispatch_uci_command(line, board, info):
 
     if cmd.startswith("ucinewgame"):
         ParsePosition("position startpos", board)
+        ClearForNewGame(board)
         return True
 
-    if cmd.startswith("go"):
-        ParseGo(cmd, info, board)
+    if cmd.startswith("setoption"):
+        ParseSetOption(cmd, info, board)
+        return True
+
+    if cmd.startswith("bench"):
+        Bench(ParseBenchDepth(cmd.split()[1:]))
         return True
 
     if cmd.startswith("quit"):
@@ -173,12 +298,40 @@ def _dispatch_uci_command(line, board, info):
     if cmd.startswith("uci"):
         _send(f"id name {ENGINE_NAME}")
         _send("id author Hydra")
+        _send_options()
         _send("uciok")
         return True
 
     return True
 
 
+def _read_commands(commands):
+    # Reader thread: every stdin line goes on the queue, None marks EOF.
+    while True:
+        line = sys.stdin.readline()
+        if line == "":
+            commands.put(None)
+            return
+        if line.strip():
+            commands.put(line)
+
+
+def _start_search(line, board, info, commands):
+    # The search owns board and info until it queues SEARCH_DONE; CheckUp
+    # sees stop/quit through info.stop_event instead of polling stdin.
+    info.stop_event.clear()
+
+    def run():
+        try:
+            ParseGo(line, info, board)
+        finally:
+            commands.put(SEARCH_DONE)
+
+    thread = threading.Thread(target=run, name="hydra-search", daemon=True)
+    thread.start()
+    return thread
+
+
 def UciLoop():
     _configure_stdio()
     AllInit()
@@ -186,18 +339,61 @@ def UciLoop():
     board = Board()
     board.parse_fen(INITIAL_FEN)
     info = SearchInfo()
-    info.stdin_enabled = 1
+    info.stdin_enabled = 0
+    info.stop_event = threading.Event()
 
     _send(f"id name {ENGINE_NAME}")
     _send("id author Hydra")
+    _send_options()
     _send("uciok")
 
+    commands = queue.Queue()
+    reader = threading.Thread(target=_read_commands, args=(commands,), name="hydra-stdin", daemon=True)
+    reader.start()
+
+    # While a search runs only isready, stop and quit are handled at once.
+    # Everything else waits in `deferred` and runs, in order, after bestmove.
+    search = None
+    deferred = deque()
     while True:
-        line = sys.stdin.readline()
-        if line == "":
-            break
+        if search is None and deferred:
+            line = deferred.popleft()
+        else:
+            line = commands.get()
+
+        if line is SEARCH_DONE:
+            search.join()
+            search = None
+            continue
 
-        if line == "\n":
+        if line is None:
+            # EOF: let a running search finish (piped "go depth N"), then quit.
+            if search is None:
+                break
+            deferred.append("quit")
+            continue
+        cmd = line.strip()
+
+        if search is not None:
+            if cmd.startswith("isready"):
+                _send("readyok")
+            elif cmd.startswith("ponderhit"):
+                PonderHit(info)
+            elif cmd.startswith("stop"):
+                info.stop_event.set()
+            elif cmd.startswith("quit"):
+                # Nothing queued behind quit should still run.
+                info.stop_event.set()
+                deferred.clear()
+                deferred.append(line)
+            else:
+                deferred.append(line)
+            continue
+
+        if cmd.startswith("go"):
+            search = _start_search(cmd, board, info, commands)
+            continue
+        if cmd.startswith("stop") or cmd.startswith("ponderhit"):
             continue
         if not _dispatch_uci_command(line, board, info):
             break
@@ -206,4 +402,9 @@ def UciLoop():
 
 
 if __name__ == "__main__":
-    UciLoop()
+    # "python uci.py bench [depth]" runs the benchmark and exits.
+    if len(sys.argv) > 1 and sys.argv[1] in ("bench", "--bench"):
+        AllInit()
+        Bench(ParseBenchDepth(sys.argv[2:]))
+    else:
+        UciLoop()